@@ -0,0 +1,107 @@
+"""
+Admission control for upload jobs and upstream FHIR calls.
+
+At most XPC_MAX_JOBS uploads run at a time. A few more
+(XPC_MAX_QUEUED_JOBS) may wait up to XPC_QUEUE_TIMEOUT seconds for a slot;
+anything beyond that is turned away at once with a 503 and a Retry-After
+hint instead of piling onto the FHIR server. Upstream calls of all jobs
+together are capped by XPC_MAX_UPSTREAM_CALLS; those wait for a free slot
+rather than fail.
+
+The limits are for the whole server: each of the XPC_WEB_WORKERS processes
+gets an equal share. A worker always gets at least one slot, so with more
+workers than slots the total is one per worker instead; gunicorn.conf.py
+keeps its default worker count within XPC_MAX_JOBS and warns when
+XPC_WEB_WORKERS goes past a limit. A busy worker may turn an upload away
+while another still has room; clients retry after Retry-After.
+"""
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Optional
+
+from settings import get_settings
+
+
+class Overloaded(Exception):
+    """
+    No slot became free; the client should retry after `retry_after` seconds.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server is busy, retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class AdmissionControl:
+    """
+    Counting limit with a bounded, timed wait queue.
+
+    max_waiting=None lets any number of callers wait; wait_timeout=None
+    waits for as long as it takes.
+    """
+
+    def __init__(self, limit: int, max_waiting: Optional[int] = 0, wait_timeout: Optional[float] = None,
+                 retry_after: int = 1):
+        self.limit = max(1, limit)
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @contextmanager
+    def slot(self):
+        with self._condition:
+            if self.active >= self.limit:
+                if self.max_waiting is not None and self.waiting >= self.max_waiting:
+                    self.rejected += 1
+                    raise Overloaded(self.retry_after)
+                self.waiting += 1
+                try:
+                    free = self._condition.wait_for(lambda: self.active < self.limit, self.wait_timeout)
+                finally:
+                    self.waiting -= 1
+                if not free:
+                    self.rejected += 1
+                    raise Overloaded(self.retry_after)
+            self.active += 1
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.active -= 1
+                self._condition.notify()
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'queue_depth': self.waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected
+            }
+
+
+def worker_share(limit: int, minimum: int = 1) -> int:
+    """
+    This process's part of a server-wide limit.
+    """
+    return max(minimum, limit // max(1, get_settings().web_workers))
+
+
+@lru_cache(maxsize=None)
+def job_admission() -> AdmissionControl:
+    settings = get_settings()
+    return AdmissionControl(worker_share(settings.max_jobs), worker_share(settings.max_queued_jobs, 0),
+                            settings.queue_timeout, settings.retry_after)
+
+
+@lru_cache(maxsize=None)
+def upstream_admission() -> AdmissionControl:
+    return AdmissionControl(worker_share(get_settings().max_upstream_calls), max_waiting=None)
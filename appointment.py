@@ -1,23 +1,18 @@
-import os
-import requests
-from dotenv import load_dotenv
+from caching import SingleFlight
+from http_client import auth_headers, cached_get, send
+from settings import get_settings
 
-# Load environment variables from .env file
-load_dotenv()
+# Requests go through http_client, which imports requests on first use, so
+# importing this module (e.g. from app.py) stays cheap and works without any
+# configuration. GET searches are revalidated against the on-disk cache.
 
+# Concurrent rows asking for the same search share one upstream request
+searches = SingleFlight()
 
-XPC_API_KEY = os.getenv('XPC_API_KEY')
-XPC_FHIR_API_BASE_URL = os.getenv('XPC_FHIR_API_BASE_URL')
-
-# Print the loaded environment variables for debugging
-# print(f"XPC_API_KEY: {XPC_API_KEY}")
-# print(f"XPC_FHIR_API_BASE_URL: {XPC_FHIR_API_BASE_URL}")
-
-
-# Base URLs for each FHIR resource
-APPOINTMENT_URL = XPC_FHIR_API_BASE_URL.rstrip('/') + '/Appointment'
-PATIENT_URL = XPC_FHIR_API_BASE_URL.rstrip('/') + '/Patient'
-PRACTITIONER_URL = XPC_FHIR_API_BASE_URL.rstrip('/') + '/Practitioner'
+# Lookups only read the first match's id; lean searches ask the server for
+# just that (FHIR _elements/_count), servers that don't support it ignore it
+LOOKUP_ELEMENTS = "id,name"
+APPOINTMENT_ELEMENTS = "id,status,start,end"
 
 # Mapping for appointment types: Display -> Code
 APPOINTMENT_TYPE_MAP = {
@@ -37,25 +32,12 @@ def create_appointment(patient_id, practitioner_id, reason_text, start_time, end
             f"Invalid appointment type: {appointment_type_display}. "
             f"Valid types are: {list(APPOINTMENT_TYPE_MAP.keys())}"
         )
-<<<<<<< HEAD
-    
-    appointment_type_code = APPOINTMENT_TYPE_MAP[appointment_type_display]
-    
-=======
 
     appointment_type_code = APPOINTMENT_TYPE_MAP[appointment_type_display]
 
->>>>>>> 1488e6d3eb876b58aaaa28400b2d25045fd31f04
-    headers = {
-        "Authorization": f"Bearer {XPC_API_KEY}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-<<<<<<< HEAD
-    
-=======
+    settings = get_settings()
+    headers = auth_headers("application/json")
 
->>>>>>> 1488e6d3eb876b58aaaa28400b2d25045fd31f04
     payload = {
         "resourceType": "Appointment",
         "reasonCode": [{
@@ -87,84 +69,95 @@ def create_appointment(patient_id, practitioner_id, reason_text, start_time, end
         { "reference": "Location/1"}],
         "status": "proposed"
     }
-<<<<<<< HEAD
-    
-    response = requests.post(APPOINTMENT_URL, headers=headers, json=payload)
-    
-=======
 
-    response = requests.post(APPOINTMENT_URL, headers=headers, json=payload)
+    response = send("POST", settings.appointment_url, headers=headers, json=payload)
 
->>>>>>> 1488e6d3eb876b58aaaa28400b2d25045fd31f04
     return {
         "status_code": response.status_code,
         "response_body": response.text
     }
 
+@searches.coalesce
 def search_patient_by_name(patient_name):
     """
     Search for a patient by name and return the first matching patient ID.
     """
-    headers = {
-        "Authorization": f"Bearer {XPC_API_KEY}",
-        "Accept": "application/json"
-    }
+    settings = get_settings()
     # FHIR search using the 'name' parameter
-    params = {"name": patient_name}
-    response = requests.get(PATIENT_URL, headers=headers, params=params)
-<<<<<<< HEAD
-    
-    if response.status_code != 200:
-        raise Exception(f"Error searching patient: {response.status_code} {response.text}")
-    
-    data = response.json()
-    if data.get("total", 0) == 0 or "entry" not in data:
-        raise Exception(f"No patient found with name '{patient_name}'")
-    
-=======
+    params = lookup_params({"name": patient_name})
+    response = cached_get(settings.patient_url, params=params)
 
     if response.status_code != 200:
         raise Exception(f"Error searching patient: {response.status_code} {response.text}")
 
     data = response.json()
-    if data.get("total", 0) == 0 or "entry" not in data:
+    # A lean (_count=1) Bundle may leave out total; the entry is what counts
+    if not data.get("entry"):
         raise Exception(f"No patient found with name '{patient_name}'")
 
->>>>>>> 1488e6d3eb876b58aaaa28400b2d25045fd31f04
     # Extract and return the patient id from the first entry
     patient_id = data["entry"][0]["resource"]["id"]
     return patient_id
 
+@searches.coalesce
 def search_practitioner_by_name(practitioner_name):
     """
     Search for a practitioner by name and return the first matching practitioner ID.
     """
-    headers = {
-        "Authorization": f"Bearer {XPC_API_KEY}",
-        "Accept": "application/json"
-    }
+    settings = get_settings()
     # FHIR search using the 'name' parameter
-    params = {"name": practitioner_name}
-    response = requests.get(PRACTITIONER_URL, headers=headers, params=params)
-<<<<<<< HEAD
-    
-    if response.status_code != 200:
-        raise Exception(f"Error searching practitioner: {response.status_code} {response.text}")
-    
-    data = response.json()
-    if data.get("total", 0) == 0 or "entry" not in data:
-        raise Exception(f"No practitioner found with name '{practitioner_name}'")
-    
-=======
+    params = lookup_params({"name": practitioner_name})
+    response = cached_get(settings.practitioner_url, params=params)
 
     if response.status_code != 200:
         raise Exception(f"Error searching practitioner: {response.status_code} {response.text}")
 
     data = response.json()
-    if data.get("total", 0) == 0 or "entry" not in data:
+    # A lean (_count=1) Bundle may leave out total; the entry is what counts
+    if not data.get("entry"):
         raise Exception(f"No practitioner found with name '{practitioner_name}'")
 
->>>>>>> 1488e6d3eb876b58aaaa28400b2d25045fd31f04
     # Extract and return the practitioner id from the first entry
     practitioner_id = data["entry"][0]["resource"]["id"]
-    return practitioner_id
\ No newline at end of file
+    return practitioner_id
+
+def lookup_params(params):
+    """
+    Search parameters for a first-match lookup, trimmed to one entry's id and name in lean mode.
+    """
+    if not get_settings().lean_search:
+        return params
+    return dict(params, _elements=LOOKUP_ELEMENTS, _count="1")
+
+def iter_search(url, params=None, what="resources"):
+    """
+    Yield the resources of a FHIR search lazily, fetching the Bundle's next page only when needed.
+    """
+    while url:
+        response = cached_get(url, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Error searching {what}: {response.status_code} {response.text}")
+
+        data = response.json()
+        for entry in data.get("entry", []):
+            if "resource" in entry:
+                yield entry["resource"]
+        # Follow the Bundle's next page; its URL already carries the search parameters
+        url = next((link["url"] for link in data.get("link", []) if link.get("relation") == "next"), None)
+        params = None
+
+@searches.coalesce
+def search_appointments(practitioner_id, start_date, end_date):
+    """
+    Return the Appointment resources of a practitioner between two dates (end exclusive).
+    """
+    settings = get_settings()
+    params = [
+        ("practitioner", f"Practitioner/{practitioner_id}"),
+        ("date", f"ge{start_date}"),
+        ("date", f"lt{end_date}")
+    ]
+    if settings.lean_search:
+        # The schedule check only reads these
+        params.append(("_elements", APPOINTMENT_ELEMENTS))
+    return list(iter_search(settings.appointment_url, params, "appointments"))
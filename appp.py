@@ -1,10 +1,12 @@
 import csv
 import io
-import os
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from flask import Flask, request, render_template, jsonify
+from flask import Flask, request, jsonify
+from settings import get_settings
+from static_assets import send_asset
+from schema import Field, Schema, int_or_zero
 from patient0 import create_patient0
 from appointment import search_patient_by_name, search_practitioner_by_name, create_appointment
 
@@ -38,28 +40,26 @@ class Patient:
             'appointment_type_display': self.appointment_type_display
         }
 
+# Headers are the field names themselves, e.g. "firstname,lastname,age,..."
+PATIENT_SCHEMA = Schema([
+    Field('firstname'),
+    Field('lastname'),
+    Field('age', convert=int_or_zero, default=0),
+    Field('sex'),
+    Field('gender'),
+    Field('practitioner_name'),
+    Field('appointment_date'),
+    Field('appointment_time'),
+    Field('reason_text'),
+    Field('appointment_type_display'),
+], build=Patient, label='patient')
+
 def parse_csv(file_content: str) -> List[Patient]:
-    patients = []
-    csv_reader = csv.DictReader(io.StringIO(file_content))
-    for row in csv_reader:
-        patient = Patient(
-            firstname=row.get('firstname', ''),
-            lastname=row.get('lastname', ''),
-            age=int(row.get('age', 0)) if row.get('age') else 0,
-            sex=row.get('sex', ''),
-            gender=row.get('gender', ''),
-            practitioner_name=row.get('practitioner_name', ''),
-            appointment_date=row.get('appointment_date', ''),
-            appointment_time=row.get('appointment_time', ''),
-            reason_text=row.get('reason_text', ''),
-            appointment_type_display=row.get('appointment_type_display', '')
-        )
-        patients.append(patient)
-    return patients
+    return list(PATIENT_SCHEMA.parse_rows(csv.reader(io.StringIO(file_content))))
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return send_asset('appp.html')
 
 @app.route('/process', methods=['POST'])
 def process_csv():
@@ -112,54 +112,7 @@ def process_csv():
         
         return jsonify(result)
 
-# Create templates directory and HTML file
-def create_template():
-    if not os.path.exists('templates'):
-        os.makedirs('templates')
-    
-    with open('templates/index.html', 'w') as f:
-        f.write("""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>XPC Medical Data Processor</title>
-</head>
-<body>
-    <div class="container">
-        <h1>Upload CSV File</h1>
-        <form action="/process" method="post" enctype="multipart/form-data">
-            <div class="form-group">
-                <label for="csv_file">CSV File:</label>
-                <input type="file" id="csv_file" name="csv_file" accept=".csv">
-            </div>
-            <button type="submit">Upload and Process</button>
-        </form>
-        <div id="result"></div>
-    </div>
-    <script>
-        document.querySelector('form').addEventListener('submit', function(event) {
-            event.preventDefault();
-            const formData = new FormData(event.target);
-            fetch('/process', {
-                method: 'POST',
-                body: formData
-            })
-            .then(response => response.json())
-            .then(data => {
-                const resultDiv = document.getElementById('result');
-                resultDiv.innerHTML = JSON.stringify(data, null, 2);
-            })
-            .catch(error => {
-                console.error('Error:', error);
-            });
-        });
-    </script>
-</body>
-</html>
-        """)
 
 if __name__ == '__main__':
-    create_template()
-    app.run(debug=True)
\ No newline at end of file
+    # Development server only; production runs wsgi.py under gunicorn.conf.py
+    app.run(debug=get_settings().debug)
@@ -0,0 +1,84 @@
+"""
+Parquet extract vs. the same rows as CSV, parsed into Patients.
+
+The CSV path is what a warehouse extract went through before: written out
+as CSV, then read by iter_medical_csv(). The Parquet file carries extra
+warehouse columns that the columnar reader never loads. Both must yield
+the same Patients.
+
+    python benchmarks/bench_columnar.py --rows 500000
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar import iter_columnar  # noqa: E402
+from csv_parser import iter_medical_csv  # noqa: E402
+
+HEADER = ['Name', 'Age', 'Gender', 'Sex', 'Type of appointment', 'Appointment date', 'Appointment time',
+          'Physician', 'Reason for visit']
+
+
+def rows(count):
+    for i in range(count):
+        yield [f'Mary {i} Smith', 25 + i % 50, 'female', 'F', 'Phone Call', '2025-03-02',
+               f'{8 + i % 9:02d}:00:00', 'Paulius Mui, MD', 'Flu']
+
+
+def write_csv(path, count):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows(count))
+
+
+def write_parquet(path, count):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = list(zip(*rows(count)))
+    table = pa.table({name: list(values) for name, values in zip(HEADER, columns)})
+    # Columns a warehouse extract carries that the import doesn't need
+    table = table.append_column('Notes', pa.array(['x' * 200] * count))
+    table = table.append_column('Billing code', pa.array(range(count)))
+    pq.write_table(table, path, row_group_size=64 * 1024)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'extract.csv')
+        parquet_path = os.path.join(directory, 'extract.parquet')
+        write_parquet(parquet_path, args.rows)
+
+        def via_csv():
+            write_csv(csv_path, args.rows)
+            with open(csv_path, newline='') as f:
+                return list(iter_medical_csv(f))
+
+        csv_time, expected = timed(via_csv)
+        parquet_time, result = timed(lambda: list(iter_columnar(parquet_path)))
+        status = 'ok' if result == expected else 'MISMATCH'
+        print(f"{args.rows} rows: csv export+parse {csv_time:6.3f}s  parquet {parquet_time:6.3f}s  "
+              f"x{csv_time / parquet_time:.2f}  {status}")
+        print(f"file size: csv {os.path.getsize(csv_path) / 1e6:.1f} MB  "
+              f"parquet {os.path.getsize(parquet_path) / 1e6:.1f} MB (with unused columns)")
+    return 0 if status == 'ok' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Cold-start import benchmark for the FHIR client modules.
+
+Each module is imported in a fresh interpreter with the XPC_* variables
+unset, so a module that reads configuration or pulls in requests, dotenv or
+canvas_sdk at import time shows up here as a failure.
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --runs 20 --max-ms 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['settings', 'appointment', 'patient0', 'note', 'hpi', 'app']
+
+# Modules that must only be loaded on first use
+DEFERRED = ['requests', 'dotenv', 'canvas_sdk', 'pip._vendor.requests']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'ms': elapsed * 1000,
+    'loaded': [name for name in {deferred!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure(module, runs):
+    env = {k: v for k, v in os.environ.items() if not k.startswith('XPC_')}
+    timings = []
+    loaded = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module, deferred=DEFERRED)],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            return None, [], proc.stderr.strip().splitlines()[-1]
+        sample = json.loads(proc.stdout.strip().splitlines()[-1])
+        timings.append(sample['ms'])
+        loaded = sample['loaded']
+    return statistics.median(timings), loaded, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='imports per module (default: 10)')
+    parser.add_argument('--max-ms', type=float, default=None, help='fail if any median import exceeds this')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        median_ms, loaded, error = measure(module, args.runs)
+        if error:
+            print(f"{module:<12} FAILED  {error}")
+            failed = True
+            continue
+        status = 'ok'
+        if loaded:
+            status = 'eager: ' + ', '.join(loaded)
+            failed = True
+        elif args.max_ms is not None and median_ms > args.max_ms:
+            status = f'over budget ({args.max_ms:.0f} ms)'
+            failed = True
+        print(f"{module:<12} {median_ms:8.2f} ms  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
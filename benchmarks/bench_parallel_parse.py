@@ -0,0 +1,71 @@
+"""
+Sequential vs. multi-process parsing of a large row-based CSV.
+
+Generates a synthetic export (with quoted fields containing commas and
+newlines), checks that the parallel parser returns exactly the same
+patients, and prints the speed-up for each worker count.
+
+    python benchmarks/bench_parallel_parse.py --rows 1000000 --workers 1 2 4 8
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parallel_parse import iter_csv_parallel  # noqa: E402
+from csv_parser import iter_medical_csv  # noqa: E402
+from uploads import open_csv_path  # noqa: E402
+
+HEADER = ['Name', 'Age', 'Gender', 'Sex', 'Type of appointment', 'Appointment date',
+          'Appointment time', 'Physician', 'Reason for visit']
+
+
+def write_sample(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            reason = f'cough, fever\nday {i % 7}' if i % 10 == 0 else 'Flu'
+            writer.writerow([f'Patient {i} Smith', 20 + i % 60, 'female', 'F', 'Office Visit',
+                             '2025-03-02', '13:00:00', 'Paulius Mui, MD', reason])
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, os.cpu_count() or 1])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sample.csv')
+        write_sample(path, args.rows)
+        print(f"{args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        def sequential():
+            with open_csv_path(path) as stream:
+                return list(iter_medical_csv(stream))
+
+        base_time, expected = timed(sequential)
+        print(f"sequential   {base_time:7.2f}s")
+
+        for workers in args.workers:
+            elapsed, patients = timed(lambda: list(iter_csv_parallel(path, workers, min_parallel_bytes=0)))
+            status = 'ok' if patients == expected else 'MISMATCH'
+            print(f"{workers:2d} workers   {elapsed:7.2f}s  x{base_time / elapsed:.2f}  {status}")
+            if status != 'ok':
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Schema-compiled parsers vs. the dict-per-row parsers they replaced.
+
+The legacy_* functions are the previous implementations, kept here as the
+baseline: app.py's row-based parser (dict per row, header normalised for
+every cell), appp.py's and interface.py's csv.DictReader parsers.
+
+    python benchmarks/bench_parsers.py --rows 200000
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import appp  # noqa: E402
+import interface  # noqa: E402
+from csv_parser import Patient, parse_row_based_csv, split_name  # noqa: E402
+
+
+def legacy_row_based(reader):
+    patients = []
+    headers = [h.strip() for h in reader[0]]
+    for row_index in range(1, len(reader)):
+        row = reader[row_index]
+        if not any(cell.strip() for cell in row):
+            continue
+        patient_data = {}
+        for col_index, header in enumerate(headers):
+            if col_index < len(row):
+                if header:
+                    patient_data[header.lower().replace(' ', '_')] = row[col_index].strip()
+        first_name, last_name = split_name(patient_data.get('name', ''))
+        age_str = patient_data.get('age', '0')
+        try:
+            age = int(age_str)
+        except ValueError:
+            age = 0
+        patients.append(Patient(
+            first_name=first_name,
+            last_name=last_name,
+            age=age,
+            gender=patient_data.get('gender', ''),
+            sex=patient_data.get('sex', ''),
+            appointment_type=patient_data.get('type_of_appointment', ''),
+            appointment_date=patient_data.get('appointment_date', ''),
+            appointment_time=patient_data.get('appointment_time', ''),
+            physician=patient_data.get('physician', ''),
+            reason_for_visit=patient_data.get('reason_for_visit', '')
+        ))
+    return patients
+
+
+def legacy_appp(file_content):
+    patients = []
+    for row in csv.DictReader(io.StringIO(file_content)):
+        patients.append(appp.Patient(
+            firstname=row.get('firstname', ''),
+            lastname=row.get('lastname', ''),
+            age=int(row.get('age', 0)) if row.get('age') else 0,
+            sex=row.get('sex', ''),
+            gender=row.get('gender', ''),
+            practitioner_name=row.get('practitioner_name', ''),
+            appointment_date=row.get('appointment_date', ''),
+            appointment_time=row.get('appointment_time', ''),
+            reason_text=row.get('reason_text', ''),
+            appointment_type_display=row.get('appointment_type_display', '')
+        ))
+    return patients
+
+
+def legacy_interface(content):
+    return [interface.Person(
+        id=int(row.get('id', 0)),
+        name=row.get('name', ''),
+        age=int(row.get('age', 0)),
+        email=row.get('email')
+    ) for row in csv.DictReader(io.StringIO(content))]
+
+
+def medical_csv(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['Name', 'Age', 'Gender', 'Sex', 'Type of appointment', 'Appointment date',
+                     'Appointment time', 'Physician', 'Reason for visit'])
+    for i in range(rows):
+        writer.writerow([f'Mary {i} Smith', 25, 'female', 'F', 'Phone Call', '2025-03-02', '13:00:00',
+                         'Paulius Mui, MD', 'Flu'])
+    return out.getvalue()
+
+
+def appp_csv(rows):
+    lines = ['firstname,lastname,age,sex,gender,practitioner_name,appointment_date,'
+             'appointment_time,reason_text,appointment_type_display']
+    lines += [f'Mary,Smith{i},25,F,female,Amanda Miller,2025-03-10,13:30:00,Urgent Visit,Telemedicine'
+              for i in range(rows)]
+    return '\n'.join(lines) + '\n'
+
+
+def interface_csv(rows):
+    return 'id,name,age,email\n' + ''.join(f'{i},Jane {i},25,jane{i}@example.com\n' for i in range(rows))
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    medical = list(csv.reader(io.StringIO(medical_csv(args.rows))))
+    appp_content = appp_csv(args.rows)
+    interface_content = interface_csv(args.rows)
+
+    cases = [
+        ('app row-based', lambda: legacy_row_based(medical), lambda: parse_row_based_csv(medical)),
+        ('appp', lambda: legacy_appp(appp_content), lambda: appp.parse_csv(appp_content)),
+        ('interface', lambda: legacy_interface(interface_content),
+         lambda: interface.parse_csv_content(interface_content)),
+    ]
+
+    failed = False
+    print(f"{args.rows} rows, best of {args.repeat}")
+    for name, legacy, compiled in cases:
+        legacy_time, expected = best_of(legacy, args.repeat)
+        compiled_time, result = best_of(compiled, args.repeat)
+        status = 'ok' if result == expected else 'MISMATCH'
+        failed |= status != 'ok'
+        print(f"{name:<14} legacy {legacy_time:6.3f}s  schema {compiled_time:6.3f}s  "
+              f"x{legacy_time / compiled_time:.2f}  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Werkzeug dev server vs. gunicorn (gevent workers) under concurrent uploads.
+
+A fake FHIR server with a fixed per-call latency runs in this process; each
+server under test is started as a subprocess pointing at it, and the same
+number of concurrent clients POST a small CSV to /process with send_api set.
+Throughput and latency percentiles are printed for each server.
+
+    python benchmarks/bench_serving.py --clients 32 --requests 128 --upstream-ms 50
+    python benchmarks/bench_serving.py --servers gunicorn --workers 4
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADER = ('Name,Age,Gender,Sex,Type of appointment,Appointment date,Appointment time,'
+          'Physician,Reason for visit\n')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def fake_fhir(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, status, payload):
+            time.sleep(latency)
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/fhir+json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith('/Appointment'):
+                self._reply(200, {'resourceType': 'Bundle', 'total': 0, 'entry': []})
+            else:
+                self._reply(200, {'resourceType': 'Bundle', 'total': 1, 'entry': [{'resource': {'id': 'x1'}}]})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self._reply(201, {'id': 'new'})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', free_port()), Handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_server(kind, port, upstream_url, workers):
+    env = dict(os.environ)
+    env.update({
+        'XPC_API_KEY': 'bench',
+        'XPC_FHIR_API_BASE_URL': upstream_url,
+        'XPC_HTTP_CACHE_PATH': '',
+        # Measure the server, not the admission limits
+        'XPC_MAX_JOBS': '100000',
+        'XPC_MAX_UPSTREAM_CALLS': '100000',
+        'XPC_BIND': f'127.0.0.1:{port}',
+        'XPC_WEB_WORKERS': str(workers),
+        'PYTHONUNBUFFERED': '1',
+    })
+    if kind == 'dev':
+        command = [sys.executable, '-c', f"from app import app; app.run(port={port}, threaded=True)"]
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(session, base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if session.get(base_url + '/metrics', timeout=1).status_code == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def failed(response):
+    # /process reports many failures as {'error': ...} with a 200
+    if response.status_code != 200:
+        return True
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    return isinstance(body, dict) and 'error' in body
+
+
+def run_load(base_url, clients, total, csv_body):
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=clients)
+    session.mount('http://', adapter)
+    wait_ready(session, base_url)
+
+    def one(_):
+        start = time.perf_counter()
+        response = session.post(base_url + '/process', data={'send_api': 'true', 'verbose': '0'},
+                                files={'csv_file': ('bench.csv', csv_body, 'text/csv')})
+        return time.perf_counter() - start, failed(response)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, error in results if error)
+    return {
+        'rps': total / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(0.95 * (len(latencies) - 1))],
+        'errors': errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', choices=['dev', 'gunicorn'], default=['dev', 'gunicorn'])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=128)
+    parser.add_argument('--rows', type=int, default=2, help='CSV rows per upload')
+    parser.add_argument('--upstream-ms', type=float, default=50)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='gunicorn worker processes')
+    args = parser.parse_args(argv)
+
+    upstream = fake_fhir(args.upstream_ms / 1000)
+    upstream_url = f'http://127.0.0.1:{upstream.server_address[1]}/'
+    rows = ''.join(f'Patient {i} Smith,30,female,F,Office Visit,2025-03-02,{9 + i % 8:02d}:00:00,Dr Who,Flu\n'
+                   for i in range(args.rows))
+    csv_body = (HEADER + rows).encode()
+
+    print(f"{args.clients} clients, {args.requests} uploads of {args.rows} rows, "
+          f"{args.upstream_ms:.0f} ms upstream latency")
+    for kind in args.servers:
+        port = free_port()
+        process = start_server(kind, port, upstream_url, args.workers)
+        try:
+            result = run_load(f'http://127.0.0.1:{port}', args.clients, args.requests, csv_body)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        label = 'dev server' if kind == 'dev' else f'gunicorn x{args.workers}'
+        print(f"{label:<14} {result['rps']:7.1f} req/s  p50 {result['p50'] * 1000:7.0f} ms  "
+              f"p95 {result['p95'] * 1000:7.0f} ms  errors {result['errors']}")
+    upstream.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
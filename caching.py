@@ -0,0 +1,100 @@
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable
+
+
+class LookupCache:
+    """
+    Thread-safe memo of successful lookups, shared by every worker of a batch.
+
+    Wraps a one-argument lookup such as search_practitioner_by_name. Only
+    results are cached; a lookup that raises is retried on the next call.
+    """
+
+    def __init__(self, lookup: Callable[[Any], Any]):
+        self._lookup = lookup
+        self._values: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, key):
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                return self._values[key]
+            self.misses += 1
+
+        value = self._lookup(key)
+        with self._lock:
+            self._values[key] = value
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._values)}
+
+
+class _Flight:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one.
+
+    While a call for a key is in flight, callers asking for the same key wait
+    for it and share its result, or its exception, instead of repeating the
+    request. Nothing is kept once the call returns; that is the caches' job.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.suppressed = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.suppressed += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fn(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.value
+
+    def coalesce(self, fn: Callable) -> Callable:
+        """
+        Decorator: concurrent calls of `fn` with equal arguments share one execution.
+        """
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            return self.do((fn.__name__, args, tuple(sorted(kwargs.items()))), fn, *args, **kwargs)
+        return wrapper
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'calls': self.calls, 'suppressed': self.suppressed, 'in_flight': len(self._flights)}
@@ -0,0 +1,208 @@
+"""
+Checkpoints for resumable bulk imports.
+
+A checkpoint is a pair of files:
+
+    <path>       small JSON state, rewritten atomically after every chunk
+    <path>.ids   JSON lines, one per finished row, with the ids it created
+
+The state records the file fingerprint, how many rows are done and, for
+row-based CSVs, the byte offset of the next unread record. Resuming seeks
+straight to that offset, so neither parsing nor upstream calls are repeated
+for committed chunks. Rows of the chunk that was in flight when the run died
+are sent again.
+"""
+import csv
+import hashlib
+import itertools
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterator, List, Optional
+
+from csv_parser import (
+    ReadPosition, detect_csv_format, iter_medical_csv, iter_row_based_csv, iter_rows_with_offsets,
+    FORMAT_DETECTION_ROWS
+)
+from pipeline import RowOutcome, run_chunks
+from uploads import SNIFF_BYTES, open_csv_path, sniff_encoding
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# Encodings where b'\n' may appear inside a character, so byte offsets can't be used
+_WIDE_ENCODINGS = ('utf-16', 'utf-32')
+
+
+@dataclass
+class Checkpoint:
+    fingerprint: str
+    format: str
+    encoding: str
+    rows_done: int = 0
+    byte_offset: Optional[int] = None
+    header: Optional[List[str]] = None
+    complete: bool = False
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Hash the whole file, so a checkpoint is never applied to an edited export.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_checkpoint(path: str) -> Optional[Checkpoint]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return Checkpoint(**json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, checkpoint: Checkpoint):
+    """
+    Write the checkpoint atomically: a crash leaves either the old or the new state.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(asdict(checkpoint), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def outcome_record(outcome: RowOutcome) -> dict:
+    item = outcome.item or {}
+    return {
+        'row': outcome.index,
+        'patient_id': item.get('patient_id'),
+        'appointment_id': item.get('appointment_id'),
+        'status_code': (item.get('appointment_response') or {}).get('status_code'),
+        'error': outcome.error
+    }
+
+
+def append_ids(path: str, outcomes: List[RowOutcome]):
+    with open(path, 'a', encoding='utf-8') as f:
+        for outcome in outcomes:
+            f.write(json.dumps(outcome_record(outcome)) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_created_ids(path: str, rows_done: Optional[int] = None) -> List[dict]:
+    """
+    Read the ids log, ignoring rows past `rows_done` that were never committed.
+    """
+    records = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash mid-write
+                    break
+                if rows_done is None or record['row'] < rows_done:
+                    records.append(record)
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _rewrite_ids(path: str, records: List[dict]):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    os.replace(tmp_path, path)
+
+
+def start_checkpoint(csv_path: str, fingerprint: str) -> Checkpoint:
+    """
+    Inspect a CSV and build the checkpoint for a fresh run.
+    """
+    with open(csv_path, 'rb') as f:
+        sample = f.read(SNIFF_BYTES)
+        complete = not f.read(1)
+    encoding = sniff_encoding(sample, complete=complete)
+
+    with open_csv_path(csv_path) as stream:
+        head = list(itertools.islice(csv.reader(stream), FORMAT_DETECTION_ROWS))
+    csv_format = detect_csv_format(head) if head else 'unknown'
+
+    checkpoint = Checkpoint(fingerprint=fingerprint, format=csv_format, encoding=encoding)
+    if csv_format != 'column_based' and encoding not in _WIDE_ENCODINGS:
+        position = ReadPosition()
+        with open(csv_path, 'rb') as f:
+            checkpoint.header = next(iter_rows_with_offsets(f, encoding, position), None)
+        checkpoint.byte_offset = position.offset
+    return checkpoint
+
+
+@contextmanager
+def open_remaining_patients(csv_path: str, checkpoint: Checkpoint):
+    """
+    Yield (patients, position) for the rows a checkpoint hasn't covered yet.
+    """
+    if checkpoint.byte_offset is None:
+        # No usable offset: re-parse and skip the committed rows
+        with open_csv_path(csv_path) as stream:
+            yield itertools.islice(iter_medical_csv(stream), checkpoint.rows_done, None), None
+        return
+
+    position = ReadPosition(checkpoint.byte_offset)
+    with open(csv_path, 'rb') as binary:
+        binary.seek(checkpoint.byte_offset)
+        records = iter_rows_with_offsets(binary, checkpoint.encoding, position)
+        rows = itertools.chain([checkpoint.header or []], records)
+        yield iter_row_based_csv(rows), position
+
+
+def run_with_checkpoints(csv_path: str, checkpoint_path: str, resume: bool = False,
+                         **run_options) -> Iterator[List[RowOutcome]]:
+    """
+    run_chunks() over a CSV file, committing a checkpoint after every chunk.
+
+    With resume=True an existing checkpoint for the same file is picked up
+    where it stopped; a checkpoint for a different file is an error.
+    """
+    ids_path = checkpoint_path + '.ids'
+    fingerprint = file_fingerprint(csv_path)
+
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint is not None and checkpoint.fingerprint != fingerprint:
+        raise ValueError(f"{checkpoint_path} was written for a different version of {csv_path}")
+
+    if checkpoint is None:
+        checkpoint = start_checkpoint(csv_path, fingerprint)
+        _rewrite_ids(ids_path, [])
+        save_checkpoint(checkpoint_path, checkpoint)
+    else:
+        # Drop ids of a chunk that was logged but never committed
+        _rewrite_ids(ids_path, load_created_ids(ids_path, checkpoint.rows_done))
+
+    if checkpoint.byte_offset is not None and checkpoint.byte_offset >= os.path.getsize(csv_path):
+        checkpoint.complete = True
+    if checkpoint.complete:
+        save_checkpoint(checkpoint_path, checkpoint)
+        return
+
+    with open_remaining_patients(csv_path, checkpoint) as (patients, position):
+        for chunk in run_chunks(patients, start_index=checkpoint.rows_done, **run_options):
+            append_ids(ids_path, chunk)
+            checkpoint.rows_done += len(chunk)
+            if position is not None:
+                checkpoint.byte_offset = position.offset
+            save_checkpoint(checkpoint_path, checkpoint)
+            yield chunk
+
+    checkpoint.complete = True
+    save_checkpoint(checkpoint_path, checkpoint)
@@ -0,0 +1,216 @@
+"""
+Columnar (Parquet / Arrow IPC) input for large imports.
+
+Warehouse extracts are read with pyarrow, which is optional: only the
+columns that PATIENT_SCHEMA maps to are loaded, one record batch at a
+time, and each batch is trimmed, parsed and validated a column at a time
+with pyarrow.compute before its rows become Patient objects. Column names
+are matched like CSV headers ("Type of appointment" -> type_of_appointment).
+Dates and times may be real date/time/timestamp columns or text in the
+formats the CSV reader accepts; a timestamp date column also supplies the
+time when there is no time column. Rows without a valid appointment date
+and time are kept with both blank, like the unbooked patients of an NDJSON
+export: they only create the patient, and are recorded as not sent when
+appointments are booked.
+"""
+from typing import Dict, Iterator, List, Optional
+
+from csv_parser import PATIENT_SCHEMA, Patient
+from schema import normalize_header
+
+COLUMNAR_SUFFIXES = ('.parquet', '.pq', '.arrow', '.feather')
+
+# Rows per record batch; bounds memory, not the number of upstream calls
+BATCH_ROWS = 4096
+
+# The formats of csv_parser.parse_date_time, the usual one first. Arrow's %Y
+# also takes two digits, so %y has to be tried before it.
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%y', '%m/%d/%Y')
+TIME_FORMATS = ('%H:%M:%S', '%H:%M', '%I:%M %p')
+
+
+def _pyarrow():
+    # pyarrow is optional; without it columnar uploads are rejected with a message
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def is_columnar(filename: Optional[str]) -> bool:
+    return bool(filename) and filename.lower().endswith(COLUMNAR_SUFFIXES)
+
+
+def resolve_columns(names: List[str]) -> Dict[str, str]:
+    """
+    Map each PATIENT_SCHEMA field to the source column holding it; later duplicates win, as for CSV headers.
+    """
+    positions = {normalize_header(name): name for name in names if normalize_header(name)}
+    columns = {}
+    for field in PATIENT_SCHEMA.fields:
+        column = next((positions[h] for h in field.accepted_headers if h in positions), None)
+        if column is not None:
+            columns[field.name] = column
+    return columns
+
+
+class _BatchNormalizer:
+    """
+    Turns one record batch into Patients, column by column.
+    """
+
+    def __init__(self, pa, columns: Dict[str, str]):
+        self.pa = pa
+        self.pc = pa.compute
+        self.columns = columns
+        self.skipped = 0
+
+    def _text(self, batch, field: str, default: str = ''):
+        pa, pc = self.pa, self.pc
+        column = self.columns.get(field)
+        if column is None:
+            return pa.repeat(default, batch.num_rows).cast(pa.string())
+        values = batch.column(column)
+        if pa.types.is_dictionary(values.type):
+            values = values.dictionary_decode()
+        values = pc.utf8_trim_whitespace(pc.cast(values, pa.string()))
+        return pc.fill_null(values, default)
+
+    def _age(self, batch):
+        pa, pc = self.pa, self.pc
+        column = self.columns.get('age')
+        if column is None:
+            return pa.repeat(0, batch.num_rows).cast(pa.int64())
+        values = batch.column(column)
+        if pa.types.is_integer(values.type) or pa.types.is_floating(values.type):
+            return pc.fill_null(pc.cast(values, pa.int64(), safe=False), 0)
+        # Like int_or_zero(): blank or malformed values become 0
+        text = self._text(batch, 'age')
+        valid = pc.match_substring_regex(text, r'^[+-]?\d+$')
+        return pc.cast(pc.if_else(valid, text, '0'), pa.int64())
+
+    def _timestamps(self, values, formats):
+        """
+        Parse a column to naive UTC timestamps; values matching none of `formats` become null.
+        """
+        pa, pc = self.pa, self.pc
+        if pa.types.is_dictionary(values.type):
+            values = values.dictionary_decode()
+        if pa.types.is_timestamp(values.type):
+            # Dropping the zone keeps the UTC instant, which is how the pipeline books;
+            # whole seconds keep strftime's %S free of a fraction
+            return pc.cast(values, pa.timestamp('s'), safe=False)
+        if pa.types.is_date(values.type):
+            return pc.cast(values, pa.timestamp('s'))
+        text = pc.utf8_trim_whitespace(pc.cast(values, pa.string()))
+        parsed = pa.nulls(len(text), pa.timestamp('s'))
+        for fmt in formats:
+            # Later formats only matter while some values are still unparsed
+            if parsed.null_count == text.null_count:
+                break
+            parsed = pc.coalesce(parsed, pc.strptime(text, format=fmt, unit='s', error_is_null=True))
+        return parsed
+
+    def _date(self, batch):
+        column = self.columns.get('appointment_date')
+        if column is None:
+            return self.pa.nulls(batch.num_rows, self.pa.string())
+        return self.pc.strftime(self._timestamps(batch.column(column), DATE_FORMATS), format='%Y-%m-%d')
+
+    def _time(self, batch):
+        pa, pc = self.pa, self.pc
+        column = self.columns.get('appointment_time')
+        if column is None:
+            date_column = self.columns.get('appointment_date')
+            if date_column is None or not pa.types.is_timestamp(batch.column(date_column).type):
+                return pa.nulls(batch.num_rows, pa.string())
+            values = self._timestamps(batch.column(date_column), ())
+        else:
+            values = batch.column(column)
+            if pa.types.is_time(values.type):
+                # 'HH:MM:SS' followed by any fraction of a second
+                return pc.utf8_slice_codeunits(pc.cast(values, pa.string()), 0, 8)
+            values = self._timestamps(values, TIME_FORMATS)
+        return pc.strftime(values, format='%H:%M:%S')
+
+    def patients(self, batch) -> List[Patient]:
+        pa, pc = self.pa, self.pc
+        # split_name(): first word, then the rest with runs of whitespace collapsed
+        names = pc.replace_substring_regex(self._text(batch, 'name'), r'\s+', ' ')
+        parts = pc.extract_regex(names, r'^(?P<first>\S*) ?(?P<last>.*)$')
+        dates = self._date(batch)
+        times = self._time(batch)
+        # process_patient() leaves a row with neither unsent; half a slot can't be booked either
+        booked = pc.and_(pc.is_valid(dates), pc.is_valid(times))
+        dates = pc.if_else(booked, dates, '')
+        times = pc.if_else(booked, times, '')
+        valid = pc.not_equal(names, '')
+        skipped = batch.num_rows - pc.sum(pc.cast(valid, pa.int64())).as_py()
+        if skipped:
+            self.skipped += skipped
+            print(f"Skipping {skipped} patient rows without a name")
+
+        columns = [
+            pc.struct_field(parts, [0]), pc.struct_field(parts, [1]),
+            self._age(batch),
+            pc.utf8_lower(self._text(batch, 'gender')),
+            pc.utf8_upper(self._text(batch, 'sex')),
+            self._text(batch, 'appointment_type'),
+            dates, times,
+            self._text(batch, 'physician'),
+            self._text(batch, 'reason_for_visit'),
+            self._text(batch, 'mrn')
+        ]
+        if skipped:
+            columns = [pc.filter(column, valid) for column in columns]
+        return [Patient(*row) for row in zip(*(column.to_pylist() for column in columns))]
+
+
+def _open_batches(pa, source, batch_rows: int):
+    """
+    Return (column names, function yielding record batches of the given columns) for a Parquet or Arrow IPC source.
+    """
+    start = source.tell() if hasattr(source, 'tell') else None
+    try:
+        reader = pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        if start is not None:
+            source.seek(start)
+        parquet = pa.parquet.ParquetFile(source)
+        return parquet.schema_arrow.names, lambda columns: parquet.iter_batches(batch_size=batch_rows, columns=columns)
+
+    def ipc_batches(columns):
+        for index in range(reader.num_record_batches):
+            yield reader.get_batch(index).select(columns)
+    return reader.schema.names, ipc_batches
+
+
+def iter_columnar_batches(source, batch_rows: int = BATCH_ROWS) -> Iterator[List[Patient]]:
+    """
+    Read a Parquet or Arrow IPC file (path or binary stream) and yield its Patients a record batch at a time.
+    """
+    pa = _pyarrow()
+    if pa is None:
+        raise ValueError("Parquet and Arrow uploads need pyarrow (pip install pyarrow)")
+    names, batches = _open_batches(pa, source, batch_rows)
+    columns = resolve_columns(names)
+    if 'name' not in columns:
+        raise ValueError(f"Columnar file needs at least a name column, found {names}")
+
+    normalizer = _BatchNormalizer(pa, columns)
+    for batch in batches(sorted(set(columns.values()))):
+        patients = normalizer.patients(batch)
+        if patients:
+            yield patients
+
+
+def iter_columnar(source, batch_rows: int = BATCH_ROWS) -> Iterator[Patient]:
+    """
+    The Patients of a columnar file one by one, decoded a record batch at a time.
+    """
+    for patients in iter_columnar_batches(source, batch_rows):
+        yield from patients
@@ -0,0 +1,63 @@
+import gzip
+from typing import Iterable, Optional
+
+# Encodings we can produce, in order of preference when the client accepts several
+SUPPORTED_ENCODINGS = ('br', 'gzip')
+
+
+def _brotli():
+    # brotli is optional; without it only gzip is offered
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def available_encodings() -> tuple:
+    if _brotli() is None:
+        return ('gzip',)
+    return SUPPORTED_ENCODINGS
+
+
+def negotiate_encoding(accept_encoding: Optional[str], offered: Iterable[str]) -> Optional[str]:
+    """
+    Pick the best encoding from `offered` for an Accept-Encoding header, or None for identity.
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+
+    wildcard = accepted.get('*', 0.0)
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding in offered and accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """
+    Compress `data` with the given content-coding ('gzip' or 'br').
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9 if level is None else level)
+    if encoding == 'br':
+        brotli = _brotli()
+        if brotli is None:
+            raise ValueError("brotli is not installed")
+        return brotli.compress(data, quality=11 if level is None else level)
+    raise ValueError(f"Unsupported encoding: {encoding}")
@@ -1,65 +1,173 @@
-from patient0 import create_patient0
-from appointment import search_patient_by_name, search_practitioner_by_name, create_appointment
-from datetime import datetime, timedelta
-import os
-
-# Verify that the API key and base URL are loaded
-XPC_API_KEY = os.environ.get("XPC_API_KEY")
-XPC_FHIR_API_BASE_URL = os.environ.get("XPC_FHIR_API_BASE_URL")
-
-
-# Input the patient details
-firstname = "John"
-lastname = "titor"
-age = 97
-sex = "M"  # Options: F, M, OTH, UNK
-gender = "male"  # Options: female, male, other, unknown
-
-# Create patient
-patient_response = create_patient0(firstname, lastname, age, sex, gender)
-
-# Input the appointment details
-patient_name = f"{firstname} {lastname}"
-practitioner_name = "Amanda Miller"
-appointment_date = "2025-03-10"  # YYYY-MM-DD format
-appointment_time = "13:30:00"    # HH:MM:SS format
-reason_text = "Urgent Visit"
-appointment_type_display = "Home Visit"  # Options: Home Visit, Telemedicine, Office Visit, Lab Visit, Phone Call
-
-# Combine date and time into a single datetime object
-start_datetime = datetime.strptime(f"{appointment_date}T{appointment_time}", "%Y-%m-%dT%H:%M:%S")
-
-# Calculate end time by adding 1 hour to start time
-end_datetime = start_datetime + timedelta(hours=1)
-
-# Format start and end times in the required format
-start_time = start_datetime.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-end_time = end_datetime.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-
-# Search for the practitioner ID based on their name
-try:
-    patient_id = search_patient_by_name(patient_name)
-    print(f"Found patient ID: {patient_id} for patient name: {patient_name}")
-except Exception as e:
-    print(f"Error finding patient: {e}")
-    patient_id = None
-
-
-try:
-    practitioner_id = search_practitioner_by_name(practitioner_name)
-    print(f"Found practitioner ID: {practitioner_id} for practitioner name: {practitioner_name}")
-except Exception as e:
-    print(f"Error finding practitioner: {e}")
-    practitioner_id = None
-
-if not practitioner_id:
-    raise ValueError("Failed to find practitioner. No practitioner ID returned.")
-
-# Create appointment
-appointment_response = create_appointment(
-    patient_id, practitioner_id, reason_text, start_time, end_time, appointment_type_display
-)
-
-print("Appointment creation response:")
-print("Status Code:", appointment_response["status_code"])
-print("Response Body:", appointment_response["response_body"])
\ No newline at end of file
+"""
+Bulk-import patients and appointments from a CSV file, without the web app.
+
+    python create_patient_and_appointment.py patients.csv
+    python create_patient_and_appointment.py patients.csv --concurrency 8 --rate-limit 20
+    python create_patient_and_appointment.py patients.csv --patients-only
+    python create_patient_and_appointment.py patients.csv --checkpoint run.ckpt --resume
+    python create_patient_and_appointment.py patients.csv --create-notes
+    python create_patient_and_appointment.py extract.parquet --concurrency 8
+
+The CSV is parsed by the same code as the /process endpoint, so both the
+row-based and the column-based formats are accepted. Parquet and Arrow IPC
+files (.parquet, .arrow, .feather; needs pyarrow) are read a record batch
+at a time. XPC_API_KEY and
+XPC_FHIR_API_BASE_URL are read from the environment (or a .env file).
+"""
+import argparse
+import sys
+import time
+from contextlib import ExitStack
+
+from checkpoint import run_with_checkpoints
+from columnar import is_columnar, iter_columnar
+from csv_parser import iter_medical_csv
+from note import create_notes, note_spec_for
+from parallel_parse import iter_csv_parallel
+from pipeline import new_schedule, run_chunks
+from settings import get_settings
+from uploads import open_csv_path
+
+
+class Progress:
+    """
+    Single-line progress display with the running rows/sec rate.
+    """
+
+    def __init__(self, stream=sys.stderr, enabled=True, interval=0.5):
+        self.stream = stream
+        self.enabled = enabled
+        self.interval = interval
+        self.started = time.monotonic()
+        self._last_draw = 0.0
+
+    def rate(self, rows):
+        elapsed = time.monotonic() - self.started
+        return rows / elapsed if elapsed > 0 else 0.0
+
+    def update(self, rows, failed, force=False):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_draw < self.interval:
+            return
+        self._last_draw = now
+        self.stream.write(f"\r{rows} rows  {self.rate(rows):.1f} rows/s  {failed} failed")
+        self.stream.flush()
+
+    def finish(self, rows, failed):
+        if self.enabled:
+            self.update(rows, failed, force=True)
+            self.stream.write('\n')
+            self.stream.flush()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('csv_path', help='CSV (or Parquet/Arrow) file to import')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='rows submitted in parallel (default: 1)')
+    parser.add_argument('--rate-limit', type=float, default=None, metavar='ROWS_PER_SEC',
+                        help='maximum rows started per second (default: unlimited)')
+    parser.add_argument('--chunk-size', type=int, default=100,
+                        help='rows read and submitted per chunk (default: 100)')
+    parser.add_argument('--parse-workers', type=int, default=1,
+                        help='processes used to parse large row-based CSVs (default: 1)')
+    parser.add_argument('--no-progress', dest='progress', action='store_false',
+                        help='disable the progress line on stderr')
+    parser.add_argument('--checkpoint', metavar='PATH', default=None,
+                        help='commit progress to PATH after every chunk '
+                             '(default with --resume: CSV_PATH.checkpoint)')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue from the checkpoint of an interrupted run')
+    parser.add_argument('--no-conflict-check', dest='conflict_check', action='store_false',
+                        help="don't check appointments against the practitioners' existing bookings")
+    parser.add_argument('--conditional-create', action='store_true', default=None,
+                        help='create patients with If-None-Exist so re-imports reuse existing records '
+                             '(default: XPC_PATIENT_CONDITIONAL_CREATE)')
+    parser.add_argument('--create-notes', action='store_true',
+                        help='create an encounter note for every appointment booked')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--patients-only', action='store_true',
+                      help='create patients but do not book appointments')
+    mode.add_argument('--appointments-only', action='store_true',
+                      help='book appointments for patients that already exist')
+    return parser
+
+
+def run(args) -> int:
+    settings = get_settings()
+    if not settings.api_key or not settings.fhir_base_url:
+        raise ValueError("API key or base URL not found. Please check your .env file.")
+
+    progress = Progress(enabled=args.progress)
+    rows = sent = failed = conflicts = notes = 0
+
+    run_options = dict(
+        send_api=not args.patients_only,
+        workers=args.concurrency,
+        rate_limit=args.rate_limit,
+        chunk_size=args.chunk_size,
+        create_patients=not args.appointments_only,
+        conditional_create=args.conditional_create,
+        schedule=new_schedule() if args.conflict_check and not args.patients_only else None
+    )
+
+    with ExitStack() as stack:
+        checkpoint_path = args.checkpoint
+        if checkpoint_path is None and args.resume:
+            checkpoint_path = args.csv_path + '.checkpoint'
+        if is_columnar(args.csv_path):
+            chunks = run_chunks(iter_columnar(args.csv_path), **run_options)
+        elif checkpoint_path:
+            chunks = run_with_checkpoints(args.csv_path, checkpoint_path, resume=args.resume, **run_options)
+        elif args.parse_workers > 1:
+            chunks = run_chunks(iter_csv_parallel(args.csv_path, args.parse_workers), **run_options)
+        else:
+            stream = stack.enter_context(open_csv_path(args.csv_path))
+            chunks = run_chunks(iter_medical_csv(stream), **run_options)
+
+        for chunk in chunks:
+            for outcome in chunk:
+                rows += 1
+                if not outcome.ok:
+                    failed += 1
+                    print(f"Row {outcome.index + 1} failed: {outcome.error}", file=sys.stderr)
+                elif outcome.item is not None and outcome.item.get('conflict'):
+                    conflicts += 1
+                    print(f"Row {outcome.index + 1} skipped: practitioner already booked "
+                          f"{outcome.item['conflict']['start']} to {outcome.item['conflict']['end']}", file=sys.stderr)
+                elif outcome.item is not None:
+                    sent += 1
+            if args.create_notes:
+                specs = (note_spec_for(outcome.item) for outcome in chunk if outcome.ok)
+                for note in create_notes((spec for spec in specs if spec is not None), args.concurrency):
+                    if note.ok:
+                        notes += 1
+                    else:
+                        failed += 1
+                        print(f"Note for patient {note.spec.patient_key} failed: {note.error}", file=sys.stderr)
+            progress.update(rows, failed)
+
+    progress.finish(rows, failed)
+    elapsed = time.monotonic() - progress.started
+    print(f"Imported {rows} rows in {elapsed:.1f}s ({progress.rate(rows):.1f} rows/s): "
+          f"{sent} appointments sent, {conflicts} conflicts skipped, {failed} failed"
+          + (f", {notes} notes created" if args.create_notes else ""))
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.parse_workers > 1 and (args.checkpoint or args.resume):
+        parser.error("--parse-workers can't be combined with --checkpoint/--resume")
+    if is_columnar(args.csv_path) and (args.checkpoint or args.resume or args.parse_workers > 1):
+        parser.error("--checkpoint/--resume and --parse-workers only apply to CSV input")
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
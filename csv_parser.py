@@ -0,0 +1,231 @@
+import codecs
+import csv
+import io
+import itertools
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Iterator
+from datetime import datetime
+from schema import Field, Schema, int_or_zero
+
+# Patient data model
+@dataclass
+class Patient:
+    first_name: str
+    last_name: str
+    age: int
+    gender: str
+    sex: str
+    appointment_type: str
+    appointment_date: datetime
+    appointment_time: datetime
+    physician: str
+    reason_for_visit: str
+    mrn: str = ''
+    # FHIR id of the physician when the input references one (NDJSON); skips the name search
+    practitioner_id: str = ''
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'age': self.age,
+            'gender': self.gender,
+            'sex': self.sex,
+            'appointment_type': self.appointment_type,
+            'appointment_date': self.appointment_date.strftime('%Y-%m-%d') if isinstance(self.appointment_date, datetime) else self.appointment_date,
+            'appointment_time': self.appointment_time.strftime('%H:%M:%S') if isinstance(self.appointment_time, datetime) else self.appointment_time,
+            'physician': self.physician,
+            'reason_for_visit': self.reason_for_visit,
+            'mrn': self.mrn,
+            'practitioner_id': self.practitioner_id
+        }
+
+def split_name(full_name: str) -> (str, str):
+    parts = full_name.split()
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    elif len(parts) > 2:
+        return parts[0], ' '.join(parts[1:])
+    else:
+        return full_name, ''
+
+def _build_patient(name, age, gender, sex, appointment_type, appointment_date, appointment_time,
+                   physician, reason_for_visit, mrn) -> Patient:
+    first_name, last_name = split_name(name)
+    return Patient(first_name, last_name, age, gender, sex, appointment_type, appointment_date,
+                   appointment_time, physician, reason_for_visit, mrn)
+
+# Column layout shared by the row-based and the column-based formats. Headers
+# are matched after normalize_header(), e.g. "Type of appointment".
+PATIENT_SCHEMA = Schema([
+    Field('name'),
+    Field('age', convert=int_or_zero, default=0),
+    Field('gender'),
+    Field('sex'),
+    Field('appointment_type', headers=('type_of_appointment',)),
+    Field('appointment_date'),
+    Field('appointment_time'),
+    Field('physician'),
+    Field('reason_for_visit'),
+    Field('mrn', headers=('mrn', 'medical_record_number', 'identifier')),
+], build=_build_patient, label='patient')
+
+# Rows read up front to detect the CSV format before streaming the rest
+FORMAT_DETECTION_ROWS = 50
+
+# Function to parse the CSV file - detects and handles different formats
+def iter_medical_csv(stream) -> Iterator[Patient]:
+    """
+    Parse a CSV text stream lazily, yielding one Patient at a time.
+    """
+    rows = csv.reader(stream)
+    head = list(itertools.islice(rows, FORMAT_DETECTION_ROWS))
+    
+    # If file is empty
+    if not head:
+        raise ValueError("CSV file is empty")
+    
+    # Detect CSV format
+    # Format 1: Field names in first column, patients in columns 3+
+    # Format 2: Field names in first row, patients in rows 2+
+    
+    format_type = detect_csv_format(head)
+    
+    if format_type == "column_based":
+        # Original format: fields in first column. These files hold one
+        # patient per column, so they are small enough to read whole.
+        yield from parse_column_based_csv(head + list(rows))
+    else:
+        # New format: fields in first row
+        yield from iter_row_based_csv(itertools.chain(head, rows))
+
+def parse_medical_csv(file_content) -> List[Patient]:
+    """
+    Parse CSV text (a string or a text stream) into a list of patients.
+    """
+    if isinstance(file_content, str):
+        file_content = io.StringIO(file_content)
+    return list(iter_medical_csv(file_content))
+
+def detect_csv_format(reader):
+    """
+    Detects if the CSV has field names in first column (column-based) or first row (row-based)
+    """
+    # Check first rows/columns for clues
+    if not reader or len(reader) < 2 or len(reader[0]) < 2:
+        return "unknown"
+    
+    # Look at first column for standard field names
+    first_column_fields = [row[0].strip().lower() for row in reader if row and len(row) > 0]
+    field_name_matches = sum(1 for field in ['name', 'age', 'gender', 'appointment'] if field in first_column_fields)
+    
+    # Look at first row for standard field names
+    first_row_fields = [cell.strip().lower() for cell in reader[0] if cell]
+    header_matches = sum(1 for field in ['name', 'age', 'gender', 'appointment'] if field in first_row_fields)
+    
+    # Decide based on matches
+    if field_name_matches >= 3:  # At least 3 field names found in first column
+        return "column_based"
+    elif header_matches >= 3:  # At least 3 field names found in first row
+        return "row_based"
+    else:
+        # Default to row-based if can't determine
+        return "row_based"
+
+def parse_date_time(date_str, time_str):
+    """
+    Helper function to parse dates and times with multiple format support
+    """
+    appointment_date = None
+    if date_str:
+        try:
+            # Try multiple date formats
+            date_formats = ['%m/%d/%y', '%m/%d/%Y', '%Y-%m-%d']
+            for fmt in date_formats:
+                try:
+                    appointment_date = datetime.strptime(date_str, fmt)
+                    break
+                except ValueError:
+                    continue
+            if not appointment_date:
+                # Just keep as string if parsing fails
+                appointment_date = date_str
+        except Exception:
+            appointment_date = date_str
+    
+    appointment_time = None
+    if time_str:
+        try:
+            # Try multiple time formats
+            time_formats = ['%I:%M %p', '%H:%M:%S %p', '%H:%M:%S', '%H:%M']
+            for fmt in time_formats:
+                try:
+                    appointment_time = datetime.strptime(time_str, fmt)
+                    break
+                except ValueError:
+                    continue
+            if not appointment_time:
+                # Just keep as string if parsing fails
+                appointment_time = time_str
+        except Exception:
+            appointment_time = time_str
+    
+    return appointment_date, appointment_time
+
+def parse_column_based_csv(reader):
+    """
+    Parse CSV where field names are in first column and patient data is in columns
+    """
+    return list(PATIENT_SCHEMA.parse_columns(reader))
+
+def iter_row_based_csv(rows: Iterable[List[str]]) -> Iterator[Patient]:
+    """
+    Parse CSV where field names are in first row and each patient is a row
+    """
+    rows = iter(rows)
+    header_row = next(rows, None)
+    first_row = next(rows, None)
+    if first_row is None:
+        raise ValueError("CSV file doesn't have enough rows")
+    
+    compiled = PATIENT_SCHEMA.compile(header_row)
+    yield from compiled.iter_records(itertools.chain([first_row], rows))
+
+def parse_row_based_csv(reader):
+    """
+    Parse an already-read list of CSV rows in the row-based format
+    """
+    return list(iter_row_based_csv(reader))
+
+
+class ReadPosition:
+    """
+    Byte offset just past the last CSV record handed out by iter_rows_with_offsets().
+    """
+
+    def __init__(self, offset: int = 0):
+        self.offset = offset
+
+
+def iter_rows_with_offsets(binary, encoding: str, position: ReadPosition) -> Iterator[List[str]]:
+    """
+    Read CSV records from a binary stream, keeping `position` at the end of each record.
+
+    The stream must already be positioned at `position.offset`. csv.reader
+    only pulls the lines it needs for the next record, so after a record is
+    yielded the byte count of the lines consumed so far is exactly where
+    the following record starts, which makes it a safe resume point. This
+    needs an encoding in which b'\\n' always ends a line (UTF-8, the
+    8-bit code pages), not UTF-16/32.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+    def lines():
+        while True:
+            line = binary.readline()
+            if not line:
+                return
+            position.offset += len(line)
+            yield decoder.decode(line)
+
+    yield from csv.reader(lines())
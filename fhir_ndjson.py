@@ -0,0 +1,175 @@
+"""
+Streaming input of FHIR Patient and Appointment resources as NDJSON.
+
+Bulk Data ($export) style files hold one resource per line. Each Appointment
+becomes one Patient row of the import, joined to its patient through the
+participant reference, so the rows go through the same pipeline as CSV
+rows; a Practitioner reference is passed on as the row's practitioner id,
+so the physician isn't searched by name. The file is read a line at a time:
+only a small tuple per Patient resource is kept, plus the appointments
+whose patient has not been seen yet (exports normally list patients first).
+Patients no appointment refers to become rows without an appointment at
+the end of the stream; they are created when appointments aren't sent and
+skipped (not sent) when they are.
+"""
+import json
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from csv_parser import Patient, split_name
+
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+
+BIRTH_SEX_URL = 'http://hl7.org/fhir/us/core/StructureDefinition/us-core-birthsex'
+
+# Administrative gender -> birth sex, used when the us-core-birthsex extension is missing
+SEX_FOR_GENDER = {'female': 'F', 'male': 'M', 'other': 'OTH', 'unknown': 'UNK'}
+
+# SNOMED code -> display, for appointment types sent with a code only
+APPOINTMENT_TYPE_DISPLAY = {
+    '439708006': 'Home Visit',
+    '448337001': 'Telemedicine',
+    '308335008': 'Office Visit',
+    '31108002': 'Lab Visit',
+    '185317003': 'Phone Call'
+}
+
+# (name, age, gender, sex, mrn) of a Patient resource
+PatientInfo = Tuple[str, int, str, str, str]
+
+
+def is_ndjson(filename: Optional[str]) -> bool:
+    return bool(filename) and filename.lower().endswith(NDJSON_SUFFIXES)
+
+
+def _human_name(names: List[Dict[str, Any]]) -> str:
+    if not names:
+        return ''
+    name = next((n for n in names if n.get('use') in ('official', 'usual')), names[0])
+    if name.get('text') and not (name.get('given') or name.get('family')):
+        return name['text']
+    return ' '.join(name.get('given', []) + [name.get('family', '')]).strip()
+
+
+def _age(birth_date: Optional[str], on: date) -> int:
+    try:
+        born = date.fromisoformat(birth_date[:10])
+    except (TypeError, ValueError):
+        return 0
+    return on.year - born.year - ((on.month, on.day) < (born.month, born.day))
+
+
+def patient_info(resource: Dict[str, Any]) -> PatientInfo:
+    gender = resource.get('gender', '')
+    sex = next((ext.get('valueCode') for ext in resource.get('extension', []) if ext.get('url') == BIRTH_SEX_URL),
+               None) or SEX_FOR_GENDER.get(gender, '')
+    mrn = next((identifier.get('value', '') for identifier in resource.get('identifier', [])), '')
+    return (_human_name(resource.get('name', [])), _age(resource.get('birthDate'), date.today()), gender, sex, mrn)
+
+
+def _concept_text(concept: Optional[Dict[str, Any]]) -> str:
+    if not concept:
+        return ''
+    codings = concept.get('coding', [])
+    for coding in codings:
+        if coding.get('code') in APPOINTMENT_TYPE_DISPLAY:
+            return APPOINTMENT_TYPE_DISPLAY[coding['code']]
+    return concept.get('text') or next((c['display'] for c in codings if c.get('display')), '')
+
+
+def _participant(resource: Dict[str, Any], resource_type: str) -> Dict[str, Any]:
+    prefix = resource_type + '/'
+    for participant in resource.get('participant', []):
+        actor = participant.get('actor') or {}
+        if actor.get('reference', '').startswith(prefix) or actor.get('type') == resource_type:
+            return actor
+    return {}
+
+
+def _reference_id(actor: Dict[str, Any], resource_type: str) -> str:
+    # 'Practitioner/123' -> '123'; a display-only actor has no id
+    kind, _, resource_id = actor.get('reference', '').partition('/')
+    return resource_id if kind == resource_type else ''
+
+
+def build_patient(info: PatientInfo, appointment: Optional[Dict[str, Any]]) -> Patient:
+    """
+    Combine a patient's details and one of its Appointment resources into an import row.
+
+    Without an appointment the row only carries the patient's details.
+    """
+    name, age, gender, sex, mrn = info
+    first_name, last_name = split_name(name)
+    if appointment is None:
+        return Patient(
+            first_name=first_name, last_name=last_name, age=age, gender=gender, sex=sex,
+            appointment_type='', appointment_date='', appointment_time='', physician='', reason_for_visit='',
+            mrn=mrn
+        )
+    # The pipeline books in UTC with 'YYYY-MM-DD' and 'HH:MM:SS' strings, as read from a CSV
+    start = datetime.fromisoformat(appointment['start'].replace('Z', '+00:00'))
+    if start.tzinfo is not None:
+        start = start.astimezone(timezone.utc)
+    reasons = appointment.get('reasonCode') or [{}]
+    practitioner = _participant(appointment, 'Practitioner')
+    return Patient(
+        first_name=first_name, last_name=last_name, age=age, gender=gender, sex=sex,
+        appointment_type=_concept_text(appointment.get('appointmentType')),
+        appointment_date=start.strftime('%Y-%m-%d'),
+        appointment_time=start.strftime('%H:%M:%S'),
+        physician=practitioner.get('display', ''),
+        reason_for_visit=_concept_text(reasons[0]) or appointment.get('description', ''),
+        mrn=mrn,
+        practitioner_id=_reference_id(practitioner, 'Practitioner')
+    )
+
+
+def iter_fhir_ndjson(lines: Iterable[str]) -> Iterator[Patient]:
+    """
+    Yield one Patient row per Appointment resource of an NDJSON stream, in file order where possible,
+    then one row for each Patient resource no appointment refers to.
+    """
+    patients: Dict[str, PatientInfo] = {}
+    # Patients some appointment refers to
+    booked = set()
+    # Appointments that arrived before their Patient resource, by patient id
+    waiting: Dict[str, List[Dict[str, Any]]] = {}
+
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            resource = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Line {number}: invalid JSON ({e})") from None
+        resource_type = resource.get('resourceType')
+
+        if resource_type == 'Patient':
+            info = patients[resource.get('id')] = patient_info(resource)
+            for appointment in waiting.pop(resource.get('id'), ()):
+                booked.add(resource.get('id'))
+                yield build_patient(info, appointment)
+        elif resource_type == 'Appointment':
+            if not resource.get('start'):
+                raise ValueError(f"Line {number}: Appointment {resource.get('id')} has no start")
+            actor = _participant(resource, 'Patient')
+            patient_id = _reference_id(actor, 'Patient')
+            if patient_id in patients:
+                booked.add(patient_id)
+                yield build_patient(patients[patient_id], resource)
+            elif patient_id:
+                waiting.setdefault(patient_id, []).append(resource)
+            else:
+                # No reference to follow; the display name is all there is
+                yield build_patient((actor.get('display', ''), 0, 'unknown', 'UNK', ''), resource)
+
+    # Patients never exported; book under the name the appointment gives them
+    for appointments in waiting.values():
+        for appointment in appointments:
+            actor = _participant(appointment, 'Patient')
+            yield build_patient((actor.get('display', ''), 0, 'unknown', 'UNK', ''), appointment)
+
+    for patient_id, info in patients.items():
+        if patient_id not in booked:
+            yield build_patient(info, None)
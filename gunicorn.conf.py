@@ -0,0 +1,44 @@
+"""
+Gunicorn settings for the web app.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is imported once in the master (preload_app) and the workers are
+forked from it. Workers are cooperative gevent workers by default, so one
+process keeps many uploads going while they wait on FHIR calls.
+
+    PORT / XPC_BIND            address to listen on (default 0.0.0.0:5000)
+    XPC_WEB_WORKERS            worker processes (default: one per CPU, at most XPC_MAX_JOBS)
+    XPC_WORKER_CLASS           gevent (default), gthread or sync
+    XPC_WORKER_CONNECTIONS     concurrent connections per gevent worker (default 1000)
+    XPC_WORKER_THREADS         threads per gthread worker (default 8)
+    XPC_WORKER_TIMEOUT         seconds before a silent worker is restarted (default 120)
+"""
+import multiprocessing
+import os
+import sys
+
+worker_class = os.getenv('XPC_WORKER_CLASS', 'gevent')
+
+if worker_class == 'gevent':
+    # Patch before preload_app imports the app, so requests, ssl and the
+    # app's locks are all gevent-aware in the forked workers
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = os.getenv('XPC_BIND') or f"0.0.0.0:{os.getenv('PORT', '5000')}"
+# The app splits its job and upstream limits between the workers, at least one
+# slot each (see admission.py), so more workers than slots raise the real limits
+max_jobs = int(os.getenv('XPC_MAX_JOBS') or 4)
+max_upstream_calls = int(os.getenv('XPC_MAX_UPSTREAM_CALLS') or 16)
+workers = int(os.getenv('XPC_WEB_WORKERS') or min(multiprocessing.cpu_count(), max_jobs))
+if workers > min(max_jobs, max_upstream_calls):
+    print(f"Warning: {workers} workers get one slot each, so up to {max(workers, max_jobs)} uploads and "
+          f"{max(workers, max_upstream_calls)} upstream calls may run at once; lower XPC_WEB_WORKERS to keep "
+          f"XPC_MAX_JOBS={max_jobs} and XPC_MAX_UPSTREAM_CALLS={max_upstream_calls}", file=sys.stderr)
+os.environ['XPC_WEB_WORKERS'] = str(workers)
+worker_connections = int(os.getenv('XPC_WORKER_CONNECTIONS') or 1000)
+threads = int(os.getenv('XPC_WORKER_THREADS') or 8)
+timeout = int(os.getenv('XPC_WORKER_TIMEOUT') or 120)
+preload_app = True
+accesslog = '-'
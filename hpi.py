@@ -1,7 +1,54 @@
-from canvas_sdk.commands import HistoryOfPresentIllnessCommand
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional, Tuple
 
-hpi = HistoryOfPresentIllnessCommand(
-        note_uuid='rk786p',
-        narrative='presents with chronic back pain and headaches'
+# Distinct narratives kept for reuse by iter_hpi_commands()
+MAX_NARRATIVES = 1024
+
+
+def create_hpi(note_uuid='rk786p', narrative='presents with chronic back pain and headaches'):
+    # canvas_sdk is slow to import, so only load it when a command is built
+    from canvas_sdk.commands import HistoryOfPresentIllnessCommand
+
+    return HistoryOfPresentIllnessCommand(
+        note_uuid=note_uuid,
+        narrative=narrative
     )
-        
\ No newline at end of file
+
+
+def normalize_narrative(narrative: Optional[str]) -> str:
+    return ' '.join((narrative or '').split())
+
+
+def iter_hpi_commands(rows: Iterable[Tuple[str, str]], max_narratives: int = MAX_NARRATIVES) -> Iterator:
+    """
+    Build an HPI command per (note_uuid, reason_for_visit) pair, lazily.
+
+    Narratives are whitespace-normalised and identical ones share one string:
+    a batch has a handful of reasons for visit spread over many notes, so
+    each is held once rather than once per command. Every note gets its own
+    command, as note ids don't repeat; a pair with no note or no narrative is
+    skipped. Only the `max_narratives` most recently used narratives are
+    remembered, so the stream can be arbitrarily long.
+    """
+    narratives = OrderedDict()
+    for note_uuid, narrative in rows:
+        narrative = normalize_narrative(narrative)
+        if not note_uuid or not narrative:
+            continue
+        shared = narratives.get(narrative)
+        if shared is None:
+            narratives[narrative] = shared = narrative
+            if len(narratives) > max_narratives:
+                narratives.popitem(last=False)
+        else:
+            narratives.move_to_end(narrative)
+        yield create_hpi(note_uuid, shared)
+
+
+def hpi_rows_from_notes(note_outcomes: Iterable) -> Iterator[Tuple[str, str]]:
+    """
+    (note_uuid, narrative) pairs for the notes note.create_notes() created, using each note's reason for visit.
+    """
+    for outcome in note_outcomes:
+        if outcome.ok and outcome.note_id:
+            yield outcome.note_id, outcome.spec.title
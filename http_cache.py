@@ -0,0 +1,132 @@
+"""
+On-disk cache of GET responses, revalidated with ETag / Last-Modified.
+
+Entries live in a SQLite file so they survive restarts and are shared by
+the worker processes of one user; search results name patients, so the
+file is created 0600 in a 0700 directory. A cached entry is never served
+blindly: the request is repeated with If-None-Match / If-Modified-Since,
+and a 304 answer is satisfied from disk instead of downloading the body
+again. The file is bounded by XPC_HTTP_CACHE_BYTES, evicting the least
+recently used entries first.
+"""
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from settings import private_dir, private_opener
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+@dataclass
+class CachedEntry:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: Optional[str]
+    body: bytes
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU store of response bodies and their validators.
+
+    The counters are for this process only: `hits` are requests answered
+    with 304 from the cache, `misses` are requests that downloaded a body.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        directory = os.path.dirname(path)
+        if directory:
+            private_dir(directory)
+        open(path, 'ab', opener=private_opener).close()
+        self.path = path
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def get(self, key: str) -> Optional[CachedEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, content_type, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return CachedEntry(*row) if row is not None else None
+
+    def touch(self, key: str, size: int):
+        """
+        Record a revalidated hit: bump the entry's LRU position and the counters.
+        """
+        with self._lock:
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            self.bytes_saved += size
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key: str, entry: CachedEntry):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, entry.etag, entry.last_modified, entry.content_type, entry.body,
+                 len(entry.body), time.time())
+            )
+            self._evict()
+
+    def discard(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Walk from the least recently used entry until enough space is freed
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / requests, 4) if requests else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'entries': entries,
+                'size_bytes': size,
+                'max_bytes': self.max_bytes
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,180 @@
+"""
+Shared HTTP session for upstream FHIR calls.
+
+One requests.Session per process keeps TCP/TLS connections alive between
+calls; its connection pool is sized for the number of worker threads that
+use it (XPC_HTTP_POOL_SIZE). GET searches made through cached_get() are
+revalidated against the on-disk ResponseCache.
+"""
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+from admission import upstream_admission
+from http_cache import CachedEntry, ResponseCache
+from profiling import current_profile
+from tracing import SPAN_KIND_CLIENT, current_span, span
+from settings import get_settings
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the process-wide session, creating it on first use.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # requests is imported on first use to keep module import cheap
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                pool_size = max(1, get_settings().http_pool_size)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def close_session():
+    """
+    Close the shared session; the next get_session() call opens a new one.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def auth_headers(content_type: Optional[str] = None) -> Dict[str, str]:
+    headers = {
+        'Authorization': f'Bearer {get_settings().api_key}',
+        'Accept': 'application/json'
+    }
+    if content_type:
+        headers['Content-Type'] = content_type
+    return headers
+
+
+def send(method: str, url: str, **kwargs):
+    """
+    Make one upstream request on the shared session, waiting for an upstream slot first.
+    """
+    if current_span() is not None:
+        return _traced_send(method, url, **kwargs)
+    with upstream_admission().slot():
+        profile = current_profile()
+        if profile is None:
+            return get_session().request(method, url, **kwargs)
+        started = time.perf_counter()
+        try:
+            return get_session().request(method, url, **kwargs)
+        finally:
+            profile.record_upstream(method, url, time.perf_counter() - started)
+
+
+def _traced_send(method: str, url: str, **kwargs):
+    """
+    send() inside a trace: the request gets a client span with its status code and payload sizes.
+    """
+    attributes = {'http.method': method, 'http.url': url.split('?')[0]}
+    with span(f'HTTP {method}', attributes, SPAN_KIND_CLIENT) as client:
+        waited = time.perf_counter()
+        with upstream_admission().slot():
+            client.set_attribute('upstream.slot_wait_ms', round((time.perf_counter() - waited) * 1000, 3))
+            profile = current_profile()
+            started = time.perf_counter()
+            try:
+                response = get_session().request(method, url, **kwargs)
+            finally:
+                if profile is not None:
+                    profile.record_upstream(method, url, time.perf_counter() - started)
+        client.set_attribute('http.status_code', response.status_code)
+        client.set_attribute('http.response_content_length', len(response.content))
+        body = response.request.body if response.request is not None else None
+        if body is not None:
+            client.set_attribute('http.request_content_length', len(body))
+        return response
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Return the process-wide search cache, or None when XPC_HTTP_CACHE_PATH is empty.
+    """
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        if not settings.http_cache_path:
+            return None
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(settings.http_cache_path, settings.http_cache_bytes)
+    return _cache
+
+
+class CachedResponse:
+    """
+    The parts of a requests.Response that callers use, rebuilt from a cache entry.
+    """
+
+    status_code = 200
+
+    def __init__(self, entry: CachedEntry):
+        self.content = entry.body
+        self.headers = {'Content-Type': entry.content_type or 'application/json'}
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+def cache_key(url: str, params=None) -> str:
+    if not params:
+        return url
+    items = params.items() if isinstance(params, dict) else params
+    return url + '?' + urlencode(sorted(items))
+
+
+def cached_get(url: str, params=None, headers: Optional[Dict[str, str]] = None):
+    """
+    GET with conditional revalidation: a 304 is answered from the cache instead of downloading the body again.
+    """
+    headers = dict(headers or auth_headers())
+    cache = get_response_cache()
+    if cache is None:
+        return send('GET', url, params=params, headers=headers)
+
+    key = cache_key(url, params)
+    entry = cache.get(key)
+    if entry is not None:
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+    response = send('GET', url, params=params, headers=headers)
+    if response.status_code == 304 and entry is not None:
+        cache.touch(key, len(entry.body))
+        return CachedResponse(entry)
+
+    cache.miss()
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if response.status_code == 200 and (etag or last_modified):
+        cache.put(key, CachedEntry(etag, last_modified, response.headers.get('Content-Type'), response.content))
+    elif entry is not None:
+        cache.discard(key)
+    return response
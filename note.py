@@ -1,26 +1,117 @@
-import os
-import pip._vendor.requests as requests 
-import json
+"""
+Encounter notes for imported appointments, created in bulk.
+"""
+import contextvars
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional
 
-XPC_API_KEY = os.environ.get("XPC_API_KEY")
+from http_client import auth_headers, send
+from pipeline import resource_id
+from serialization import dumps
+from settings import get_settings
 
-XPC_FHIR_API_BASE_URL = os.environ.get("XPC_FHIR_API_BASE_URL")
-url = XPC_FHIR_API_BASE_URL.rstrip('/') + '/core/api/notes/v1/Note'
+# Used when XPC_PRACTICE_LOCATION_KEY isn't set
+DEFAULT_PRACTICE_LOCATION_KEY = "d1eacdb5-9ead-47ce-855a-c8c6ef3932a6"
 
-headers = {
-    'Authorization': f'Bearer {XPC_API_KEY}',
-    'Content-Type': 'application/json'
-}
 
+@dataclass(frozen=True)
+class NoteSpec:
+    patient_key: str
+    provider_key: str
+    encounter_start_time: str  # e.g. 2025-02-03T19:00:00.000Z
+    note_type_name: str = "Office visit"
+    title: Optional[str] = None
+    practice_location_key: Optional[str] = None
 
-def create_note():
-  payload = json.dumps({
-      "title": "Some Custom Title",
-      "noteTypeName": "Office visit",
-      "patientKey": "b9d03a4edc0348caa6c030a259caa4ce",
-      "providerKey": "9b31de0f2040478e94e4f9b9b409bce0",
-      "practiceLocationKey": "d1eacdb5-9ead-47ce-855a-c8c6ef3932a6",
-      "encounterStartTime": "2025-02-03T19:00:00.016852Z"
-  })
+    def payload(self) -> Dict[str, Any]:
+        payload = {
+            "noteTypeName": self.note_type_name,
+            "patientKey": self.patient_key,
+            "providerKey": self.provider_key,
+            "practiceLocationKey": (self.practice_location_key
+                                    or get_settings().practice_location_key
+                                    or DEFAULT_PRACTICE_LOCATION_KEY),
+            "encounterStartTime": self.encounter_start_time
+        }
+        if self.title:
+            payload["title"] = self.title
+        return payload
 
-  return requests.request("POST", url, headers=headers, data=payload)
+
+@dataclass
+class NoteOutcome:
+    spec: NoteSpec
+    status_code: Optional[int] = None
+    note_id: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def create_note(spec: NoteSpec) -> Dict[str, Any]:
+    """
+    Create one note; returns the status code and body like create_appointment().
+    """
+    response = send(
+        'POST', get_settings().note_url, headers=auth_headers('application/json'), data=dumps(spec.payload())
+    )
+    return {
+        "status_code": response.status_code,
+        "response_body": response.text
+    }
+
+
+def _submit(spec: NoteSpec) -> NoteOutcome:
+    try:
+        response = create_note(spec)
+    except Exception as e:
+        return NoteOutcome(spec, error=str(e))
+
+    status_code = response["status_code"]
+    if not 200 <= status_code < 300:
+        return NoteOutcome(spec, status_code, error=f"Error creating note: {status_code} {response['response_body']}")
+    return NoteOutcome(spec, status_code, note_id=resource_id(response["response_body"]))
+
+
+def create_notes(specs: Iterable[NoteSpec], workers: int = 4) -> Iterator[NoteOutcome]:
+    """
+    Create notes with up to `workers` requests in flight, yielding outcomes in input order.
+
+    Specs are pulled from the iterable only as slots free up, so a long
+    stream is never held in memory. Failures are reported per note. Each
+    request runs in a copy of the caller's context, so the request profile
+    and trace span of the upload follow it into the pool.
+    """
+    workers = max(1, workers)
+    specs = iter(specs)
+
+    def submit(spec):
+        return executor.submit(contextvars.copy_context().run, _submit, spec)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque(submit(spec) for spec in itertools.islice(specs, workers))
+        while pending:
+            outcome = pending.popleft().result()
+            for spec in itertools.islice(specs, 1):
+                pending.append(submit(spec))
+            yield outcome
+
+
+def note_spec_for(item: Optional[Dict[str, Any]]) -> Optional[NoteSpec]:
+    """
+    Build the encounter note spec for a process_patient() result, or None if no appointment was booked.
+    """
+    if not item or not item.get("appointment_id") or not item.get("patient_id"):
+        return None
+    patient = item["patient"]
+    return NoteSpec(
+        patient_key=item["patient_id"],
+        provider_key=item["practitioner_id"],
+        encounter_start_time=f"{patient['appointment_date']}T{patient['appointment_time']}.000Z",
+        title=patient.get("reason_for_visit") or None
+    )
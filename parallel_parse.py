@@ -0,0 +1,172 @@
+"""
+Multi-process parsing of large row-based CSV files.
+
+The file is memory-mapped and cut into byte ranges that each start on a
+record boundary. A nominal cut point is only a boundary if it is not inside
+a quoted field, which is decided from the parity of the '"' characters
+before it: those are counted per range in the process pool, and each cut
+is then moved forward to the first newline outside quotes. This assumes
+RFC 4180 quoting (quotes only around fields, doubled inside them), which is
+what csv.writer and spreadsheet exports produce.
+
+The ranges are parsed in a process pool and merged back in file order.
+Only a few ranges per worker are submitted ahead of the consumer, so a slow
+consumer (upstream calls, a rate limit) holds back parsing instead of the
+parsed file piling up in memory. Small files, column-based files and
+UTF-16/32 input are parsed sequentially.
+"""
+import csv
+import io
+import itertools
+from collections import deque
+import mmap
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from csv_parser import (
+    Patient, ReadPosition, detect_csv_format, iter_medical_csv, iter_row_based_csv, iter_rows_with_offsets,
+    FORMAT_DETECTION_ROWS
+)
+from uploads import SNIFF_BYTES, open_csv_path, sniff_encoding
+
+# Files smaller than this aren't worth the process start-up cost
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+# Ranges per worker; more than one keeps the pool busy when ranges parse unevenly
+RANGES_PER_WORKER = 4
+
+# Large files are cut into more ranges, so one parsed range stays small
+MAX_RANGE_BYTES = 8 * 1024 * 1024
+
+# Ranges submitted ahead of the consumer, per worker
+IN_FLIGHT_PER_WORKER = 2
+
+# Quotes are counted in blocks of this size to bound worker memory
+COUNT_BLOCK_BYTES = 16 * 1024 * 1024
+
+_patient_values = operator.attrgetter(*(field.name for field in fields(Patient)))
+
+
+def _count_quotes(args) -> int:
+    path, start, end = args
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        count = 0
+        for block_start in range(start, end, COUNT_BLOCK_BYTES):
+            count += mapped[block_start:min(end, block_start + COUNT_BLOCK_BYTES)].count(b'"')
+        return count
+
+
+def _parse_range(args) -> List[tuple]:
+    path, start, end, encoding, header = args
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        text = mapped[start:end].decode(encoding, errors='replace')
+    rows = itertools.chain([header], csv.reader(io.StringIO(text, newline='')))
+    # Plain tuples pickle much faster than dataclass instances
+    return [_patient_values(patient) for patient in iter_row_based_csv(rows)]
+
+
+def next_record_boundary(mapped, position: int, in_quotes: bool, end: int) -> int:
+    """
+    Return the offset just past the first newline at or after `position` that isn't quoted.
+    """
+    while position < end:
+        newline = mapped.find(b'\n', position, end)
+        if newline == -1:
+            return end
+        quote = mapped.find(b'"', position, newline)
+        while quote != -1:
+            in_quotes = not in_quotes
+            quote = mapped.find(b'"', quote + 1, newline)
+        if not in_quotes:
+            return newline + 1
+        position = newline + 1
+    return end
+
+
+def split_ranges(path: str, data_start: int, parts: int, executor) -> List[Tuple[int, int]]:
+    """
+    Cut [data_start, EOF) into up to `parts` ranges that start on record boundaries.
+    """
+    size = os.path.getsize(path)
+    step = max(1, (size - data_start) // parts)
+    cuts = [data_start + step * k for k in range(1, parts) if data_start + step * k < size]
+    edges = [data_start] + cuts + [size]
+
+    counts = list(executor.map(_count_quotes, [(path, a, b) for a, b in zip(edges, edges[1:])]))
+    quotes_before = list(itertools.accumulate(counts))
+
+    boundaries = [data_start]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for cut, quotes in zip(cuts, quotes_before):
+            boundary = next_record_boundary(mapped, cut, quotes % 2 == 1, size)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def bounded_map(executor, fn: Callable, items: Iterable, in_flight: int) -> Iterator:
+    """
+    Like executor.map(), but with at most `in_flight` calls submitted and not yet consumed.
+    """
+    items = iter(items)
+    pending = deque(executor.submit(fn, item) for item in itertools.islice(items, max(1, in_flight)))
+    while pending:
+        result = pending.popleft().result()
+        for item in itertools.islice(items, 1):
+            pending.append(executor.submit(fn, item))
+        yield result
+
+
+def _read_header(path: str, encoding: str):
+    position = ReadPosition()
+    with open(path, 'rb') as f:
+        header = next(iter_rows_with_offsets(f, encoding, position), None)
+    return header, position.offset
+
+
+def _sequential(path: str) -> Iterator[Patient]:
+    with open_csv_path(path) as stream:
+        yield from iter_medical_csv(stream)
+
+
+def iter_csv_parallel(path: str, workers: Optional[int] = None,
+                      min_parallel_bytes: int = PARALLEL_MIN_BYTES) -> Iterator[Patient]:
+    """
+    Parse a CSV file across `workers` processes, yielding patients in file order.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or os.path.getsize(path) < min_parallel_bytes:
+        yield from _sequential(path)
+        return
+
+    with open(path, 'rb') as f:
+        sample = f.read(SNIFF_BYTES)
+    encoding = sniff_encoding(sample)
+    with open_csv_path(path) as stream:
+        head = list(itertools.islice(csv.reader(stream), FORMAT_DETECTION_ROWS))
+    if encoding in ('utf-16', 'utf-32') or not head or detect_csv_format(head) == 'column_based':
+        yield from _sequential(path)
+        return
+
+    header, data_start = _read_header(path, encoding)
+    # The BOM only exists at the very start, which is inside the header
+    range_encoding = 'utf-8' if encoding == 'utf-8-sig' else encoding
+
+    # Enough ranges to keep every worker busy, none of them over MAX_RANGE_BYTES
+    data_bytes = os.path.getsize(path) - data_start
+    parts = max(workers * RANGES_PER_WORKER, -(-data_bytes // MAX_RANGE_BYTES))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        ranges = split_ranges(path, data_start, parts, executor)
+        jobs = ((path, start, end, range_encoding, header) for start, end in ranges)
+        for values in bounded_map(executor, _parse_range, jobs, workers * IN_FLIGHT_PER_WORKER):
+            for patient_values in values:
+                yield Patient(*patient_values)
+
+
+def parse_csv_parallel(path: str, workers: Optional[int] = None) -> List[Patient]:
+    return list(iter_csv_parallel(path, workers))
@@ -1,10 +1,9 @@
-import requests
 from datetime import date
-import os
+from typing import Optional
+from urllib.parse import urlencode
 
-XPC_API_KEY = os.environ.get("XPC_API_KEY")
-XPC_FHIR_API_BASE_URL = os.environ.get("XPC_FHIR_API_BASE_URL")
-patient_url = XPC_FHIR_API_BASE_URL.rstrip('/') + '/Patient'
+from http_client import auth_headers, send
+from settings import get_settings
 
 
 def age_to_iso_birthday_fixed(age):
@@ -13,15 +12,50 @@ def age_to_iso_birthday_fixed(age):
     return approx_birthday.isoformat()
 
 
-def create_patient0(firstname, lastname, age, sex, gender):
+def if_none_exist_query(identifier) -> str:
+    """
+    Search criteria for a conditional create: the patient's identifier (MRN).
+
+    Name and birth date are not used: the birth date sent is only January 1st
+    of the year derived from the age, so it would merge different patients
+    with the same name and never match the real record.
+    """
+    system = get_settings().patient_identifier_system
+    return urlencode({"identifier": f"{system}|{identifier}" if system else identifier})
+
+
+def patient_id_from_location(location: Optional[str]) -> Optional[str]:
+    """
+    Pull the id out of a Location header such as .../Patient/123/_history/1.
+    """
+    if not location:
+        return None
+    parts = location.rstrip('/').split('/')
+    if 'Patient' in parts:
+        index = parts.index('Patient')
+        if index + 1 < len(parts):
+            return parts[index + 1]
+    return None
+
+
+def create_patient0(firstname, lastname, age, sex, gender, identifier=None, conditional=False):
+    """
+    Create a Patient resource.
+
+    With conditional=True and an identifier, the POST carries If-None-Exist,
+    so the server returns the matching patient instead of creating a
+    duplicate; the result then always has an 'id', and no separate search is
+    needed. Without an identifier the patient is created unconditionally.
+    """
     if sex not in ("F", "M", "OTH", "UNK"):
         raise ValueError(f"Sex {sex} is invalid")
     if gender not in ("female", "male", "other", "unknown"):
         raise ValueError(f"Gender {gender} is invalid")
-    headers = {
-        'Authorization': f'Bearer {XPC_API_KEY}',
-        'Content-Type': 'application/json'
-    }
+
+    settings = get_settings()
+    headers = auth_headers('application/json')
+    conditional = conditional and bool(identifier)
+    birth_date = age_to_iso_birthday_fixed(age)
     payload = {
         "resourceType": "Patient",
         "extension": [{
@@ -35,9 +69,14 @@ def create_patient0(firstname, lastname, age, sex, gender):
             "family": lastname,
             "given": [firstname]
         }],
-        "birthDate": age_to_iso_birthday_fixed(age)
+        "birthDate": birth_date
     }
-    response = requests.post(patient_url, headers=headers, json=payload)
+    if identifier:
+        system = settings.patient_identifier_system
+        payload["identifier"] = [{"system": system, "value": identifier} if system else {"value": identifier}]
+    if conditional:
+        headers['If-None-Exist'] = if_none_exist_query(identifier)
+    response = send("POST", settings.patient_url, headers=headers, json=payload)
 
     # Optionally, inspect the response
     print("Status Code:", response.status_code)
@@ -45,13 +84,20 @@ def create_patient0(firstname, lastname, age, sex, gender):
 
     # Check if the response body is empty
     if not response.text:
-        return {"status_code": response.status_code, "message": "Patient created successfully, but no response body."}
-
-    try:
-        return response.json()
-    except requests.exceptions.JSONDecodeError:
-<<<<<<< HEAD
-        return {"status_code": response.status_code, "message": "Patient created successfully, but response is not valid JSON."}
-=======
-        return {"status_code": response.status_code, "message": "Patient created successfully, but response is not valid JSON."}
->>>>>>> 1488e6d3eb876b58aaaa28400b2d25045fd31f04
+        result = {"status_code": response.status_code, "message": "Patient created successfully, but no response body."}
+    else:
+        try:
+            result = response.json()
+        except ValueError:
+            result = {"status_code": response.status_code, "message": "Patient created successfully, but response is not valid JSON."}
+
+    if conditional:
+        if not 200 <= response.status_code < 300:
+            raise Exception(f"Error creating patient: {response.status_code} {response.text}")
+        if not isinstance(result, dict) or not result.get("id"):
+            # 200 (matched) and 201 (created) both name the patient in Location
+            result = {"status_code": response.status_code,
+                      "id": patient_id_from_location(response.headers.get("Location"))}
+        # 200 means an existing patient matched and nothing was created
+        result.setdefault("status_code", response.status_code)
+    return result
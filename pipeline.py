@@ -0,0 +1,308 @@
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from datetime import datetime, timedelta, timezone
+from csv_parser import Patient, iter_medical_csv
+from columnar import is_columnar, iter_columnar
+from fhir_ndjson import is_ndjson, iter_fhir_ndjson
+from patient0 import create_patient0
+from appointment import search_patient_by_name, search_practitioner_by_name, create_appointment, search_appointments
+from caching import LookupCache
+from settings import get_settings
+from schedule import ScheduleIndex
+from tracing import row_span, span
+
+def process_patient(patient: Patient, send_api: bool,
+                    practitioner_lookup=None,
+                    create_patient: bool = True,
+                    schedule: Optional[ScheduleIndex] = None,
+                    conditional_create: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+    """
+    Create the patient upstream and, when send_api is set, book their appointment.
+
+    Returns the result item for the /process response, or None when no
+    appointment was sent. `practitioner_lookup` lets batch runs share a
+    LookupCache instead of searching for the same physician on every row;
+    a row that carries a `practitioner_id` isn't searched at all.
+    create_patient=False books appointments for patients that already exist.
+    With a `schedule`, a slot that overlaps one of the practitioner's
+    bookings is reported as a conflict before anything is sent.
+    `conditional_create` (default XPC_PATIENT_CONDITIONAL_CREATE) creates a
+    patient that has an MRN with If-None-Exist and takes its id from that
+    response instead of searching for it; rows without one are created as
+    usual. A row without any appointment date and time isn't sent at all.
+    """
+    if practitioner_lookup is None:
+        practitioner_lookup = search_practitioner_by_name
+    if conditional_create is None:
+        conditional_create = get_settings().patient_conditional_create
+    identifier = patient.mrn or None
+    # Only an identifier is safe to match on; see patient0.if_none_exist_query()
+    conditional_create = conditional_create and identifier is not None
+    patient_dict = patient.to_dict()
+
+    firstname = patient.first_name
+    lastname = patient.last_name
+    age = patient.age
+    sex = patient.sex  # Options: F, M, OTH, UNK
+    gender = patient.gender  # Options: female, male, other, unknown
+
+    # Simulate API call (if send_api is checked)
+    if not send_api:
+        if create_patient:
+            with span('create_patient0'):
+                create_patient0(firstname, lastname, age, sex, gender, identifier, conditional_create)
+        return None
+
+    # Input the appointment details
+    patient_name = f"{patient.first_name} {patient.last_name}"
+    if not patient.appointment_date and not patient.appointment_time:
+        # e.g. a FHIR Patient resource that no Appointment refers to; recorded as not sent
+        print(f"Skipping {patient_name}: no appointment to book")
+        return None
+    practitioner_name = patient.physician
+    appointment_date = patient.appointment_date  # YYYY-MM-DD format
+    appointment_time = patient.appointment_time    # HH:MM:SS format
+    reason_text = patient.reason_for_visit
+    appointment_type_display = patient.appointment_type  # Options: Home Visit, Telemedicine, Office Visit, Lab Visit, Phone Call
+
+    with span('parse_date_time'):
+        # Combine date and time into a single datetime object
+        start_datetime = datetime.strptime(f"{appointment_date}T{appointment_time}", "%Y-%m-%dT%H:%M:%S")
+
+        # Calculate end time by adding 1 hour to start time
+        end_datetime = start_datetime + timedelta(hours=1)
+
+        # Format start and end times in the required format
+        start_time = start_datetime.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        end_time = end_datetime.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    # Look the practitioner up first so a conflicting or unbookable row creates nothing
+    practitioner_id = patient.practitioner_id or None
+    if practitioner_id is None:
+        try:
+            with span('search_practitioner_by_name'):
+                practitioner_id = practitioner_lookup(practitioner_name)
+            print(f"Found practitioner ID: {practitioner_id} for practitioner name: {practitioner_name}")
+        except Exception as e:
+            print(f"Error finding practitioner: {e}")
+            practitioner_id = None
+
+    if not practitioner_id:
+        raise ValueError("Failed to find practitioner. No practitioner ID returned.")
+
+    # The times are sent as UTC ('Z'), so compare them as UTC
+    slot = (start_datetime.replace(tzinfo=timezone.utc), end_datetime.replace(tzinfo=timezone.utc))
+    if schedule is not None:
+        with span('check_schedule') as schedule_span:
+            conflict = schedule.reserve(practitioner_id, *slot)
+            schedule_span.set_attribute('schedule.conflict', conflict is not None)
+        if conflict is not None:
+            print(f"Skipping {patient_name}: {practitioner_name} is already booked "
+                  f"from {conflict[0].isoformat()} to {conflict[1].isoformat()}")
+            return {
+                'patient_response': None,
+                'appointment_response': None,
+                'patient': patient_dict,
+                'patient_id': None,
+                'practitioner_id': practitioner_id,
+                'appointment_id': None,
+                'conflict': {'start': conflict[0].isoformat(), 'end': conflict[1].isoformat()}
+            }
+
+    try:
+        # Create patient
+        patient_response = None
+        patient_id = None
+        if create_patient:
+            with span('create_patient0', {'conditional': conditional_create}):
+                patient_response = create_patient0(firstname, lastname, age, sex, gender, identifier,
+                                                   conditional_create)
+            if conditional_create:
+                patient_id = patient_response.get('id')
+
+        if patient_id is None:
+            try:
+                with span('search_patient_by_name'):
+                    patient_id = search_patient_by_name(patient_name)
+                print(f"Found patient ID: {patient_id} for patient name: {patient_name}")
+            except Exception as e:
+                print(f"Error finding patient: {e}")
+                patient_id = None
+
+        # Create appointment
+        with span('create_appointment') as appointment_span:
+            appointment_response = create_appointment(
+                patient_id, practitioner_id, reason_text, start_time, end_time, appointment_type_display
+            )
+            appointment_span.set_attribute('http.status_code', appointment_response.get('status_code'))
+    except Exception:
+        if schedule is not None:
+            schedule.release(practitioner_id, *slot)
+        raise
+    if schedule is not None and not 200 <= appointment_response.get('status_code', 0) < 300:
+        schedule.release(practitioner_id, *slot)
+    return {
+        'patient_response': patient_response,
+        'appointment_response': appointment_response,
+        'patient': patient_dict,
+        'patient_id': patient_id,
+        'practitioner_id': practitioner_id,
+        'appointment_id': resource_id(appointment_response.get('response_body'))
+    }
+
+def new_schedule() -> Optional[ScheduleIndex]:
+    """
+    Schedule index for one run, seeded from the server; None when XPC_SCHEDULE_CHECK=0.
+    """
+    if not get_settings().schedule_check:
+        return None
+    return ScheduleIndex(search_appointments)
+
+def resource_id(response_body) -> Optional[str]:
+    """
+    Pull the resource id out of a FHIR create response body, if there is one.
+    """
+    if not response_body:
+        return None
+    try:
+        return json.loads(response_body).get('id')
+    except (ValueError, AttributeError):
+        return None
+
+def iter_input(name: Optional[str], stream) -> Iterator[Patient]:
+    """
+    Parse an upload by its file name: Parquet/Arrow, FHIR NDJSON (.ndjson, .jsonl) or CSV.
+
+    Columnar files are read from a binary stream (see input_opener()), the others from text.
+    """
+    if is_columnar(name):
+        return iter_columnar(stream)
+    if is_ndjson(name):
+        return iter_fhir_ndjson(stream)
+    return iter_medical_csv(stream)
+
+def input_opener(name: Optional[str], upload):
+    """
+    The SpooledUpload method that opens `upload` the way iter_input() reads `name`.
+    """
+    return upload.open_binary if is_columnar(name) else upload.open_text
+
+# Per-file error messages kept in a batch summary
+MAX_SUMMARY_ERRORS = 20
+
+def summarize_file(name: str, open_stream, send_api: bool, practitioner_lookup,
+                   schedule: Optional[ScheduleIndex] = None, recorder=None) -> Dict[str, Any]:
+    """
+    Run one CSV of a batch through the upstream calls and summarise the outcome.
+
+    Unlike /process, a failing row is counted and the file carries on.
+    Each row is also handed to `recorder` (a results.RunRecorder), if given.
+    """
+    summary = {'file': name, 'rows': 0, 'sent': 0, 'failed': 0, 'conflicts': 0, 'status_codes': {}, 'errors': []}
+    try:
+        with open_stream() as stream:
+            for patient in iter_input(name, stream):
+                summary['rows'] += 1
+                try:
+                    with row_span(summary['rows'] - 1, name):
+                        item = process_patient(patient, send_api, practitioner_lookup, schedule=schedule)
+                except Exception as e:
+                    summary['failed'] += 1
+                    if len(summary['errors']) < MAX_SUMMARY_ERRORS:
+                        summary['errors'].append({'row': summary['rows'], 'error': str(e)})
+                    if recorder is not None:
+                        recorder.add(patient, error=str(e), source=name)
+                    continue
+                if recorder is not None:
+                    recorder.add(patient, item, source=name)
+                if item is not None and item.get('conflict'):
+                    summary['conflicts'] += 1
+                elif item is not None:
+                    summary['sent'] += 1
+                    status_code = str(item['appointment_response'].get('status_code'))
+                    summary['status_codes'][status_code] = summary['status_codes'].get(status_code, 0) + 1
+    except Exception as e:
+        summary['error'] = str(e)
+    return summary
+
+
+class RateLimiter:
+    """
+    Token bucket that spaces out row submissions across worker threads.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("Rate limit must be positive")
+        self.rate = rate
+        self.capacity = burst if burst is not None else 1.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+@dataclass
+class RowOutcome:
+    index: int
+    patient: Patient
+    item: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_chunks(patients: Iterable[Patient], send_api: bool = True, workers: int = 1,
+               rate_limit: Optional[float] = None, chunk_size: int = 100,
+               practitioner_lookup=None, create_patients: bool = True,
+               start_index: int = 0, schedule: Optional[ScheduleIndex] = None,
+               conditional_create: Optional[bool] = None) -> Iterator[List[RowOutcome]]:
+    """
+    Submit patients chunk by chunk and yield each chunk's outcomes in input order.
+
+    Only one chunk of patients is held at a time. Within a chunk up to
+    `workers` rows run concurrently; `rate_limit` caps rows started per
+    second across all of them. Failing rows are reported, not raised.
+    Outcome indexes count from `start_index`, for runs resumed mid-file.
+    Rows that clash with `schedule` come back as conflict items.
+    """
+    if practitioner_lookup is None:
+        practitioner_lookup = LookupCache(search_practitioner_by_name)
+    limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    def run(index, patient):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            with row_span(index):
+                return RowOutcome(index, patient, item=process_patient(
+                    patient, send_api, practitioner_lookup, create_patients, schedule, conditional_create
+                ))
+        except Exception as e:
+            return RowOutcome(index, patient, error=str(e))
+
+    rows = enumerate(patients, start_index)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while True:
+            chunk = list(itertools.islice(rows, max(1, chunk_size)))
+            if not chunk:
+                break
+            yield list(executor.map(lambda args: run(*args), chunk))
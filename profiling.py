@@ -0,0 +1,151 @@
+"""
+Opt-in profiling of single /process requests.
+
+A request carrying `X-Profile-Token: <XPC_PROFILE_TOKEN>` runs under
+cProfile. Alongside the pstats dump, a JSON report splits the request into
+CPU time spent parsing the CSV and wall time spent waiting on each FHIR
+endpoint. Without a configured token nothing is profiled, and the only
+cost left in the hot path is one context-variable lookup per upstream call.
+
+cProfile and time.thread_time() measure an OS thread, not a request. Under
+gevent every greenlet of a worker shares that thread, so anything another
+upload runs meanwhile lands in this one's pstats and CPU figures; /process
+therefore refuses to profile while the worker has other jobs running. The
+per-endpoint wall times are collected per request (through a context
+variable, which create_notes() carries into its threads) and stay exact.
+
+    python -m pstats /tmp/xpc-profiles/<report>.prof
+"""
+import cProfile
+import hmac
+import json
+import os
+import time
+import uuid
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+from settings import get_settings
+
+_current: ContextVar[Optional['RequestProfile']] = ContextVar('xpc_request_profile', default=None)
+
+
+def current_profile() -> Optional['RequestProfile']:
+    return _current.get()
+
+
+def profile_requested(token: Optional[str]) -> bool:
+    expected = get_settings().profile_token
+    return bool(expected and token) and hmac.compare_digest(expected, token)
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """
+    Group upstream calls by method and resource path, e.g. 'GET Patient'.
+    """
+    path = urlsplit(url).path
+    base = urlsplit(get_settings().fhir_base_url or '').path
+    if base and path.startswith(base):
+        path = path[len(base):]
+    return f"{method.upper()} {path.strip('/') or '/'}"
+
+
+class RequestProfile:
+    def __init__(self, label: str):
+        self.label = label
+        self.id = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:8]
+        self.profiler = cProfile.Profile()
+        self.parse_cpu = 0.0
+        self.parse_rows = 0
+        self.upstream: Dict[str, Dict[str, float]] = {}
+        # Upstream calls may be recorded from several threads at once
+        self._lock = threading.Lock()
+        self._token = None
+        self._started = 0.0
+        self._started_cpu = 0.0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self._started = time.perf_counter()
+        self._started_cpu = time.thread_time()
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Only one cProfile can be active per process; keep the timings without it
+            self.profiler = None
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.wall = time.perf_counter() - self._started
+        self.cpu = time.thread_time() - self._started_cpu
+        _current.reset(self._token)
+
+    def timed_parse(self, records: Iterable) -> Iterator:
+        """
+        Pass records through, adding the CPU time spent producing each one to parse_cpu.
+        """
+        records = iter(records)
+        while True:
+            started = time.thread_time()
+            try:
+                record = next(records)
+            except StopIteration:
+                self.parse_cpu += time.thread_time() - started
+                return
+            self.parse_cpu += time.thread_time() - started
+            self.parse_rows += 1
+            yield record
+
+    def record_upstream(self, method: str, url: str, seconds: float):
+        name = endpoint_name(method, url)
+        with self._lock:
+            stats = self.upstream.setdefault(name, {'calls': 0, 'wall': 0.0, 'max': 0.0})
+            stats['calls'] += 1
+            stats['wall'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+
+    def report(self) -> Dict[str, Any]:
+        upstream_wall = sum(stats['wall'] for stats in self.upstream.values())
+        return {
+            'id': self.id,
+            'label': self.label,
+            'pstats': self.profiler is not None,
+            'wall_seconds': round(self.wall, 6),
+            'cpu_seconds': round(self.cpu, 6),
+            'parse': {'rows': self.parse_rows, 'cpu_seconds': round(self.parse_cpu, 6)},
+            'upstream_wall_seconds': round(upstream_wall, 6),
+            'upstream': {
+                name: {'calls': stats['calls'], 'wall_seconds': round(stats['wall'], 6),
+                       'max_seconds': round(stats['max'], 6)}
+                for name, stats in sorted(self.upstream.items(), key=lambda item: -item[1]['wall'])
+            }
+        }
+
+    def save(self, directory: str) -> Dict[str, Any]:
+        """
+        Write <id>.prof (pstats) and <id>.json (report) to `directory` and return the report.
+        """
+        os.makedirs(directory, exist_ok=True)
+        if self.profiler is not None:
+            self.profiler.dump_stats(os.path.join(directory, f'{self.id}.prof'))
+        report = self.report()
+        with open(os.path.join(directory, f'{self.id}.json'), 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+def load_report(directory: str, report_id: str) -> Optional[Dict[str, Any]]:
+    # Report ids are generated here; anything else can't name a file in `directory`
+    if not report_id.replace('-', '').isalnum():
+        return None
+    try:
+        with open(os.path.join(directory, f'{report_id}.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,95 @@
+"""
+Downloadable CSV report of each upload run.
+
+A run's rows are appended to XPC_REPORT_DIR/<run id>.csv as they finish:
+the parsed input fields of the row followed by its outcome (status, HTTP
+status code, created Patient and Appointment ids, error). Rows are written
+straight to the file, so memory stays flat however long the run is, and
+`GET /reports/<run id>` streams the file back. Reports are pruned with the
+runs in the result store. Text that a spreadsheet would run as a formula is
+prefixed with a quote.
+"""
+import csv
+import os
+from dataclasses import fields
+from typing import Any, Dict, Optional
+
+from csv_parser import Patient
+from settings import private_dir, private_opener
+
+INPUT_COLUMNS = tuple(field.name for field in fields(Patient))
+OUTCOME_COLUMNS = ('status', 'status_code', 'patient_id', 'appointment_id', 'error')
+REPORT_COLUMNS = ('row', 'source') + INPUT_COLUMNS + OUTCOME_COLUMNS
+
+# Leading characters that make spreadsheets evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def cell(value: Any) -> Any:
+    """
+    Neutralise CSV injection: text starting a formula is written with a leading quote.
+
+    Spreadsheets skip leading spaces before evaluating, so ' =1' counts too.
+    """
+    if isinstance(value, str) and (value.startswith(FORMULA_PREFIXES)
+                                   or value.lstrip().startswith(FORMULA_PREFIXES)):
+        return "'" + value
+    return value
+
+
+class ReportWriter:
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            private_dir(directory)
+        self.path = path
+        self._file = open(path, 'w', newline='', encoding='utf-8', opener=private_opener)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(REPORT_COLUMNS)
+
+    def write(self, row: int, source: Optional[str], patient_fields: Dict[str, Any], status: str,
+              status_code: Optional[int], patient_id: Optional[str], appointment_id: Optional[str],
+              error: Optional[str]):
+        self._writer.writerow([cell(value) for value in (
+            [row + 1, source] + [patient_fields.get(name) for name in INPUT_COLUMNS]
+            + [status, status_code, patient_id, appointment_id, error]
+        )])
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def report_path(directory: str, report_id: str) -> Optional[str]:
+    """
+    Path of an existing report, or None; run ids are hex, so anything else can't name a file in `directory`.
+    """
+    if not report_id.isalnum():
+        return None
+    path = os.path.join(directory, f'{report_id}.csv')
+    return path if os.path.isfile(path) else None
+
+
+def prune_reports(directory: str, keep: int):
+    """
+    Delete all but the `keep` newest reports.
+    """
+    try:
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith('.csv')]
+    except FileNotFoundError:
+        return
+    reports = []
+    for entry in entries:
+        try:
+            reports.append((entry.stat().st_mtime, entry.path))
+        except OSError:
+            # Pruned meanwhile by another worker
+            pass
+    reports.sort(reverse=True)
+    for _, path in reports[max(0, keep):]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
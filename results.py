@@ -0,0 +1,236 @@
+"""
+Per-row outcomes of upload runs, kept in SQLite for paging and filtering.
+
+Every /process or /process/batch run gets a run id; its rows are written in
+small transactions as they finish, so a large run is never held in memory
+to be browsed later. Only the newest XPC_RESULTS_KEEP_RUNS runs are kept.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from reports import ReportWriter, prune_reports
+from settings import get_settings, private_dir, private_opener
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    source TEXT,
+    rows INTEGER NOT NULL DEFAULT 0,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    source TEXT,
+    status TEXT NOT NULL,
+    status_code INTEGER,
+    patient_name TEXT,
+    physician TEXT COLLATE NOCASE,
+    appointment_date TEXT,
+    appointment_time TEXT,
+    patient_id TEXT,
+    appointment_id TEXT,
+    error TEXT,
+    detail TEXT,
+    PRIMARY KEY (run_id, row)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_status ON results (run_id, status, row);
+CREATE INDEX IF NOT EXISTS results_physician ON results (run_id, physician, row);
+CREATE INDEX IF NOT EXISTS results_date ON results (run_id, appointment_date, row);
+"""
+
+COLUMNS = ('row', 'source', 'status', 'status_code', 'patient_name', 'physician', 'appointment_date',
+           'appointment_time', 'patient_id', 'appointment_id', 'error', 'detail')
+
+# Row outcomes; see outcome_status()
+STATUSES = ('sent', 'rejected', 'failed', 'conflict', 'not_sent')
+
+MAX_PAGE_SIZE = 500
+
+
+def outcome_status(item: Optional[Dict[str, Any]], error: Optional[str]) -> str:
+    if error is not None:
+        return 'failed'
+    if item is None:
+        return 'not_sent'
+    if item.get('conflict'):
+        return 'conflict'
+    status_code = (item.get('appointment_response') or {}).get('status_code') or 0
+    return 'sent' if 200 <= status_code < 300 else 'rejected'
+
+
+class ResultStore:
+    def __init__(self, path: str, keep_runs: int = 50):
+        directory = os.path.dirname(path)
+        if directory:
+            private_dir(directory)
+        # Create the database 0600; SQLite gives its -wal and -shm files the same mode
+        open(path, 'ab', opener=private_opener).close()
+        self.keep_runs = keep_runs
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def new_run(self, source: Optional[str] = None) -> str:
+        run_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute("INSERT INTO runs (id, created, source) VALUES (?, ?, ?)", (run_id, time.time(), source))
+            old = [row[0] for row in self._db.execute(
+                "SELECT id FROM runs ORDER BY created DESC LIMIT -1 OFFSET ?", (max(1, self.keep_runs),)
+            )]
+            if old:
+                self._db.execute("BEGIN")
+                self._db.executemany("DELETE FROM results WHERE run_id = ?", [(r,) for r in old])
+                self._db.executemany("DELETE FROM runs WHERE id = ?", [(r,) for r in old])
+                self._db.execute("COMMIT")
+        return run_id
+
+    def add_rows(self, run_id: str, records: List[tuple]):
+        """
+        Insert rows given as tuples in COLUMNS order, in one transaction.
+        """
+        if not records:
+            return
+        placeholders = ', '.join('?' * (len(COLUMNS) + 1))
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO results (run_id, {', '.join(COLUMNS)}) VALUES ({placeholders})",
+                [(run_id,) + record for record in records]
+            )
+            self._db.execute("UPDATE runs SET rows = rows + ? WHERE id = ?", (len(records), run_id))
+            self._db.execute("COMMIT")
+
+    def finish_run(self, run_id: str):
+        with self._lock:
+            self._db.execute("UPDATE runs SET complete = 1 WHERE id = ?", (run_id,))
+
+    def run_info(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            run = self._db.execute(
+                "SELECT id, created, source, rows, complete FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+            if run is None:
+                return None
+            counts = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM results WHERE run_id = ? GROUP BY status", (run_id,)
+            ))
+        return {
+            'run_id': run[0],
+            'created': run[1],
+            'source': run[2],
+            'rows': run[3],
+            'complete': bool(run[4]),
+            'statuses': {status: counts.get(status, 0) for status in STATUSES}
+        }
+
+    def page(self, run_id: str, status: Optional[str] = None, physician: Optional[str] = None,
+             date: Optional[str] = None, after: int = -1, limit: int = 100) -> Dict[str, Any]:
+        """
+        One page of a run's rows in row order, continuing after row `after` (keyset pagination).
+        """
+        where = ["run_id = ?", "row > ?"]
+        params: List[Any] = [run_id, after]
+        for column, value in (('status', status), ('physician', physician), ('appointment_date', date)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM results WHERE {' AND '.join(where)} ORDER BY row LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        results = []
+        for row in rows:
+            result = dict(zip(COLUMNS, row))
+            detail = result.pop('detail')
+            result['patient'] = json.loads(detail) if detail else None
+            results.append(result)
+        return {
+            'results': results,
+            'next_cursor': rows[-1][0] if more else None
+        }
+
+
+class RunRecorder:
+    """
+    Collects a run's rows and writes them to the store in batches of `flush_rows`.
+
+    With a `report_dir`, each row is also appended to the run's CSV report
+    (see reports.py) as it is added. Thread-safe: the row numbers of a
+    batch run are assigned in arrival order.
+    """
+
+    def __init__(self, store: ResultStore, source: Optional[str] = None, flush_rows: int = 200,
+                 report_dir: Optional[str] = None):
+        self.store = store
+        self.run_id = store.new_run(source)
+        self.source = source
+        self.flush_rows = flush_rows
+        self.report = None
+        if report_dir:
+            prune_reports(report_dir, store.keep_runs - 1)
+            self.report = ReportWriter(os.path.join(report_dir, f'{self.run_id}.csv'))
+        self._pending: List[tuple] = []
+        self._next_row = 0
+        self._lock = threading.Lock()
+
+    def add(self, patient, item: Optional[Dict[str, Any]] = None, error: Optional[str] = None,
+            source: Optional[str] = None) -> int:
+        appointment_response = (item or {}).get('appointment_response') or {}
+        status = outcome_status(item, error)
+        status_code = appointment_response.get('status_code')
+        patient_id = (item or {}).get('patient_id')
+        appointment_id = (item or {}).get('appointment_id')
+        fields = patient.to_dict()
+        with self._lock:
+            row = self._next_row
+            self._next_row += 1
+            self._pending.append((
+                row, source, status, status_code,
+                f"{patient.first_name} {patient.last_name}".strip(), patient.physician,
+                str(patient.appointment_date), str(patient.appointment_time),
+                patient_id, appointment_id, error, json.dumps(fields, default=str)
+            ))
+            if self.report is not None:
+                self.report.write(row, source or self.source, fields, status, status_code, patient_id, appointment_id, error)
+            if len(self._pending) >= self.flush_rows:
+                self._flush()
+        return row
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        self.store.add_rows(self.run_id, pending)
+        if self.report is not None:
+            self.report.flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self.report is not None:
+                self.report.close()
+        self.store.finish_run(self.run_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@lru_cache(maxsize=None)
+def get_result_store() -> ResultStore:
+    settings = get_settings()
+    return ResultStore(settings.results_path, settings.results_keep_runs)
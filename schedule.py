@@ -0,0 +1,157 @@
+"""
+Per-practitioner index of booked slots, for catching double bookings before any POST.
+
+Each practitioner's bookings are kept as a sorted list of disjoint half-open
+[start, end) intervals, so an overlap check is two bisections (O(log n)).
+Existing appointments are loaded from the FHIR server the first time a
+practitioner/day pair is seen; rows are then reserved as they are submitted.
+"""
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from caching import SingleFlight
+
+# Appointment statuses that don't occupy the practitioner's time
+FREE_STATUSES = {'cancelled', 'noshow', 'entered-in-error'}
+
+
+def parse_instant(value: str) -> datetime:
+    """
+    Parse a FHIR instant ('2025-03-10T13:30:00.000Z' or with an offset) as an aware UTC datetime.
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class IntervalSet:
+    """
+    Sorted, disjoint half-open intervals with O(log n) overlap queries.
+    """
+
+    def __init__(self):
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+
+    def __len__(self):
+        return len(self._starts)
+
+    def find_overlap(self, start: datetime, end: datetime) -> Optional[Tuple[datetime, datetime]]:
+        i = bisect_right(self._starts, start)
+        # The interval starting at or before `start` overlaps if it ends after it
+        if i > 0 and self._ends[i - 1] > start:
+            return self._starts[i - 1], self._ends[i - 1]
+        # Otherwise only the next one can, if it starts before `end`
+        if i < len(self._starts) and self._starts[i] < end:
+            return self._starts[i], self._ends[i]
+        return None
+
+    def add(self, start: datetime, end: datetime):
+        """
+        Insert an interval, merging it with any it overlaps.
+        """
+        i = bisect_right(self._starts, start)
+        if i > 0 and self._ends[i - 1] > start:
+            i -= 1
+        j = i
+        while j < len(self._starts) and self._starts[j] < end:
+            start = min(start, self._starts[j])
+            end = max(end, self._ends[j])
+            j += 1
+        self._starts[i:j] = [start]
+        self._ends[i:j] = [end]
+
+    def remove(self, start: datetime, end: datetime) -> bool:
+        """
+        Remove an interval previously added without merging; returns False if it isn't there.
+        """
+        i = bisect_right(self._starts, start) - 1
+        if i >= 0 and self._starts[i] == start and self._ends[i] == end:
+            del self._starts[i]
+            del self._ends[i]
+            return True
+        return False
+
+
+class ScheduleIndex:
+    """
+    Booked slots per practitioner, seeded lazily from existing Appointment resources.
+
+    `load_appointments(practitioner_id, start_date, end_date)` returns the
+    Appointment resources for one day; pass None to skip seeding and only
+    track the rows of the current run. If loading fails (e.g. the server
+    refuses Appointment searches), the practitioner/day is tracked from the
+    rows of the current run only, and the failure is reported once.
+    Each pair is loaded once: concurrent rows for the same one wait for that
+    load, while other practitioners and days load in parallel. A slot that
+    runs past midnight seeds both of its days.
+    """
+
+    def __init__(self, load_appointments: Optional[Callable] = None):
+        self._load_appointments = load_appointments
+        self._intervals: Dict[str, IntervalSet] = {}
+        self._seeded = set()
+        self._lock = threading.Lock()
+        self._seeding = SingleFlight()
+        self.conflicts = 0
+
+    def _seed(self, practitioner_id: str, day):
+        key = (practitioner_id, day)
+        if self._load_appointments is None or key in self._seeded:
+            return
+        self._seeding.do(key, self._load, practitioner_id, day)
+
+    def _load(self, practitioner_id: str, day):
+        key = (practitioner_id, day)
+        # A row that missed the previous flight for this key gets here after it was seeded
+        if key in self._seeded:
+            return
+        try:
+            appointments = self._load_appointments(
+                practitioner_id, day.isoformat(), (day + timedelta(days=1)).isoformat()
+            )
+        except Exception as e:
+            print(f"Could not load existing appointments of practitioner {practitioner_id} on {day}, "
+                  f"checking this run's rows only: {e}")
+            appointments = []
+        with self._lock:
+            intervals = self._intervals.setdefault(practitioner_id, IntervalSet())
+            for appointment in appointments:
+                if appointment.get('status') in FREE_STATUSES:
+                    continue
+                if not appointment.get('start') or not appointment.get('end'):
+                    continue
+                intervals.add(parse_instant(appointment['start']), parse_instant(appointment['end']))
+            self._seeded.add(key)
+
+    def reserve(self, practitioner_id: str, start: datetime, end: datetime):
+        """
+        Book a slot unless it overlaps an existing one.
+
+        Returns None on success, or the (start, end) of the booking it clashes with.
+        """
+        # End is exclusive: a slot ending at midnight doesn't touch the next day
+        first_day = start.date()
+        last_day = max(first_day, (end - timedelta(microseconds=1)).date())
+        for offset in range((last_day - first_day).days + 1):
+            self._seed(practitioner_id, first_day + timedelta(days=offset))
+        with self._lock:
+            intervals = self._intervals.setdefault(practitioner_id, IntervalSet())
+            conflict = intervals.find_overlap(start, end)
+            if conflict is not None:
+                self.conflicts += 1
+                return conflict
+            intervals.add(start, end)
+            return None
+
+    def release(self, practitioner_id: str, start: datetime, end: datetime):
+        """
+        Give back a reservation whose appointment could not be created.
+        """
+        with self._lock:
+            intervals = self._intervals.get(practitioner_id)
+            if intervals is not None:
+                intervals.remove(start, end)
@@ -0,0 +1,132 @@
+"""
+Declarative CSV schemas compiled once per file.
+
+A Schema lists the fields a model is built from, each with the header names
+it may appear under, a converter and a default. Compiling it against a
+header row resolves every field to a column index up front, so building a
+record is one list of converted cells passed positionally to the model's
+constructor: no per-row dictionaries and no per-cell header normalisation.
+"""
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Column index used for fields whose header is missing; never < len(row)
+_MISSING = sys.maxsize
+
+
+def normalize_header(header: str) -> str:
+    return header.strip().lower().replace(' ', '_')
+
+
+@dataclass(frozen=True)
+class Field:
+    name: str
+    headers: Tuple[str, ...] = ()
+    convert: Callable[[str], Any] = str
+    default: Any = ''
+
+    @property
+    def accepted_headers(self) -> Tuple[str, ...]:
+        return self.headers or (self.name,)
+
+
+class Schema:
+    """
+    Field list plus the callable that turns the converted values into a record.
+
+    `build` receives one positional argument per field, in field order; it
+    defaults to the model class itself.
+    """
+
+    def __init__(self, fields: Sequence[Field], build: Callable[..., Any], label: str = 'record'):
+        self.fields = tuple(fields)
+        self.build = build
+        self.label = label
+
+    def compile(self, header_row: Sequence[str]) -> 'CompiledSchema':
+        return CompiledSchema(self, header_row)
+
+    def parse_rows(self, rows: Iterable[Sequence[str]]) -> Iterator[Any]:
+        """
+        Parse a header row followed by data rows.
+        """
+        rows = iter(rows)
+        header_row = next(rows, None)
+        if header_row is None:
+            return
+        yield from self.compile(header_row).iter_records(rows)
+
+    def parse_columns(self, rows: List[Sequence[str]], first_data_column: int = 2) -> Iterator[Any]:
+        """
+        Parse a transposed CSV: field names down the first column, one record per later column.
+        """
+        header_row = [row[0] if row else '' for row in rows]
+        compiled = self.compile(header_row)
+        width = max((len(row) for row in rows), default=0)
+        for col_index in range(first_data_column, width):
+            column = [row[col_index] if col_index < len(row) else '' for row in rows]
+            yield from compiled.iter_records([column])
+
+
+class CompiledSchema:
+    """
+    A Schema resolved against one header row.
+    """
+
+    def __init__(self, schema: Schema, header_row: Sequence[str]):
+        positions = {}
+        for index, header in enumerate(header_row):
+            key = normalize_header(header)
+            if key:
+                # Later duplicates win, as they did with the old dict-based parsers
+                positions[key] = index
+
+        slots = []
+        for field in schema.fields:
+            index = next((positions[h] for h in field.accepted_headers if h in positions), _MISSING)
+            slots.append((index, field.convert, field.default))
+
+        self.schema = schema
+        self._slots = tuple(slots)
+        self._build = schema.build
+
+    @property
+    def missing_fields(self) -> List[str]:
+        return [field.name for field, (index, _, _) in zip(self.schema.fields, self._slots) if index == _MISSING]
+
+    def build(self, row: Sequence[str]) -> Any:
+        n = len(row)
+        return self._build(*[
+            convert(row[index].strip()) if index < n else default
+            for index, convert, default in self._slots
+        ])
+
+    def iter_records(self, rows: Iterable[Sequence[str]]) -> Iterator[Any]:
+        """
+        Build a record per row, skipping blank rows and reporting rows that fail to convert.
+        """
+        build = self.build
+        for row in rows:
+            if not ''.join(row).strip():
+                continue
+            try:
+                yield build(row)
+            except (ValueError, TypeError) as e:
+                print(f"Error parsing {self.schema.label} row {row}: {e}")
+
+
+def optional_str(value: str) -> Optional[str]:
+    return value or None
+
+
+def int_or_zero(value: str) -> int:
+    """
+    Lenient integer converter: blank or malformed values become 0.
+    """
+    try:
+        return int(value)
+    except ValueError:
+        if value:
+            print(f"Invalid integer value: {value}, defaulting to 0")
+        return 0
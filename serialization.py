@@ -0,0 +1,65 @@
+import json
+from typing import Any
+
+from compression import available_encodings, compress, negotiate_encoding
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves
+MIN_COMPRESS_SIZE = 1024
+
+# Dynamic responses favour speed over ratio
+RESPONSE_COMPRESS_LEVELS = {'gzip': 5, 'br': 4}
+
+
+def _orjson():
+    # orjson is optional; the stdlib encoder is used when it isn't installed
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def dumps(payload: Any) -> bytes:
+    """
+    Encode a payload as compact UTF-8 JSON, using orjson when available.
+    """
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+
+def json_response(payload: Any, status: int = 200):
+    """
+    Build a JSON response, compressed with the best encoding the client accepts.
+    """
+    from flask import Response, request
+
+    body = dumps(payload)
+    headers = {'Vary': 'Accept-Encoding'}
+
+    if len(body) >= MIN_COMPRESS_SIZE:
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), available_encodings())
+        if encoding:
+            body = compress(body, encoding, RESPONSE_COMPRESS_LEVELS[encoding])
+            headers['Content-Encoding'] = encoding
+
+    return Response(body, status=status, mimetype='application/json', headers=headers)
+
+
+def parse_flag(value, default: bool = True) -> bool:
+    """
+    Interpret a query/form flag such as verbose=0 or verbose=true.
+    """
+    if value is None or value == '':
+        return default
+    return value.strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def parse_fields(value):
+    """
+    Split a fields=a,b,c parameter into a set, or None when it wasn't given.
+    """
+    if not value:
+        return None
+    return {field.strip() for field in value.split(',') if field.strip()}
@@ -0,0 +1,157 @@
+import os
+import stat
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Settings:
+    api_key: Optional[str]
+    fhir_base_url: Optional[str]
+    static_max_age: int = 86400
+    max_upload_bytes: int = 2 * 1024 ** 3
+    upload_spool_bytes: int = 8 * 1024 ** 2
+    max_response_rows: int = 1000
+    batch_workers: int = 4
+    schedule_check: bool = True
+    http_pool_size: int = 16
+    lean_search: bool = True
+    practice_location_key: Optional[str] = None
+    http_cache_path: Optional[str] = None
+    http_cache_bytes: int = 64 * 1024 ** 2
+    patient_conditional_create: bool = False
+    patient_identifier_system: Optional[str] = None
+    max_jobs: int = 4
+    max_queued_jobs: int = 8
+    queue_timeout: int = 10
+    retry_after: int = 5
+    max_upstream_calls: int = 16
+    web_workers: int = 1
+    debug: bool = False
+    data_dir: str = ''
+    results_path: str = ''
+    results_keep_runs: int = 50
+    report_dir: str = ''
+    profile_token: Optional[str] = None
+    profile_dir: str = ''
+    trace_file: Optional[str] = None
+
+    def fhir_url(self, path: str) -> str:
+        """
+        Build an absolute URL below the configured FHIR base URL.
+        """
+        if not self.fhir_base_url:
+            raise ValueError("XPC_FHIR_API_BASE_URL is not set. Please check your .env file.")
+        return self.fhir_base_url.rstrip('/') + '/' + path.lstrip('/')
+
+    @property
+    def appointment_url(self) -> str:
+        return self.fhir_url('Appointment')
+
+    @property
+    def patient_url(self) -> str:
+        return self.fhir_url('Patient')
+
+    @property
+    def practitioner_url(self) -> str:
+        return self.fhir_url('Practitioner')
+
+    @property
+    def note_url(self) -> str:
+        return self.fhir_url('core/api/notes/v1/Note')
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+
+
+def default_data_dir() -> str:
+    # Per user, so one account's stores never sit in another's (or a world-readable) directory
+    return os.path.join(tempfile.gettempdir(), f'xpc-{os.getuid()}')
+
+
+def private_dir(path: str) -> str:
+    """
+    Create `path` accessible to this user only (0700) and return it; refuse one owned by someone else.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a directory owned by this user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+def private_opener(path: str, flags: int) -> int:
+    """
+    opener= for open(): files it creates are readable and writable by this user only (0600).
+    """
+    return os.open(path, flags, 0o600)
+
+
+def _load_dotenv():
+    # python-dotenv is optional; plain environment variables work without it
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    Load the settings on first use and return the same object afterwards.
+    """
+    _load_dotenv()
+    # Results, reports and the search cache hold patient data; they live under a directory only this user can read
+    data_dir = os.getenv('XPC_DATA_DIR') or default_data_dir()
+    return Settings(
+        api_key=os.getenv('XPC_API_KEY'),
+        fhir_base_url=os.getenv('XPC_FHIR_API_BASE_URL'),
+        static_max_age=_env_int('XPC_STATIC_MAX_AGE', 86400),
+        max_upload_bytes=_env_int('XPC_MAX_UPLOAD_BYTES', 2 * 1024 ** 3),
+        upload_spool_bytes=_env_int('XPC_UPLOAD_SPOOL_BYTES', 8 * 1024 ** 2),
+        max_response_rows=_env_int('XPC_MAX_RESPONSE_ROWS', 1000),
+        batch_workers=_env_int('XPC_BATCH_WORKERS', 4),
+        schedule_check=bool(_env_int('XPC_SCHEDULE_CHECK', 1)),
+        http_pool_size=_env_int('XPC_HTTP_POOL_SIZE', 16),
+        lean_search=bool(_env_int('XPC_LEAN_SEARCH', 1)),
+        practice_location_key=os.getenv('XPC_PRACTICE_LOCATION_KEY'),
+        # An empty XPC_HTTP_CACHE_PATH turns the search cache off
+        http_cache_path=os.getenv('XPC_HTTP_CACHE_PATH', os.path.join(data_dir, 'http-cache.sqlite')),
+        http_cache_bytes=_env_int('XPC_HTTP_CACHE_BYTES', 64 * 1024 ** 2),
+        patient_conditional_create=bool(_env_int('XPC_PATIENT_CONDITIONAL_CREATE', 0)),
+        patient_identifier_system=os.getenv('XPC_PATIENT_IDENTIFIER_SYSTEM'),
+        max_jobs=_env_int('XPC_MAX_JOBS', 4),
+        max_queued_jobs=_env_int('XPC_MAX_QUEUED_JOBS', 8),
+        queue_timeout=_env_int('XPC_QUEUE_TIMEOUT', 10),
+        retry_after=_env_int('XPC_RETRY_AFTER', 5),
+        max_upstream_calls=_env_int('XPC_MAX_UPSTREAM_CALLS', 16),
+        # Set by gunicorn.conf.py; the development server is a single process
+        web_workers=_env_int('XPC_WEB_WORKERS', 1),
+        debug=bool(_env_int('XPC_DEBUG', 0)),
+        data_dir=data_dir,
+        results_path=os.getenv('XPC_RESULTS_PATH') or os.path.join(data_dir, 'results.sqlite'),
+        results_keep_runs=_env_int('XPC_RESULTS_KEEP_RUNS', 50),
+        report_dir=os.getenv('XPC_REPORT_DIR') or os.path.join(data_dir, 'reports'),
+        profile_token=os.getenv('XPC_PROFILE_TOKEN') or None,
+        profile_dir=os.getenv('XPC_PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'xpc-profiles'),
+        trace_file=os.getenv('XPC_TRACE_FILE') or None,
+    )
+
+
+def reset_settings():
+    """
+    Forget the loaded settings so the next get_settings() call re-reads the environment.
+    """
+    get_settings.cache_clear()
@@ -0,0 +1,159 @@
+"""
+Serve the prebuilt UI pages from static/ without going through Jinja.
+
+Each asset is read once per process, tagged with a content-hash ETag and
+kept alongside its gzip/brotli variants. Variants prebuilt with
+
+    python static_assets.py
+
+are picked up from disk (static/<name>.gz, static/<name>.br); anything
+missing or older than the source is compressed in memory on first use.
+
+Pages are served at fixed URLs, so browsers must revalidate them (no-cache,
+a 304 while the ETag still matches) to see a deploy. Other assets may be
+cached for XPC_STATIC_MAX_AGE seconds; reference them by a content-addressed
+name so a change gets a new URL.
+"""
+import hashlib
+import mimetypes
+import os
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict
+
+from compression import available_encodings, compress, negotiate_encoding
+from settings import get_settings
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# File suffix used for each prebuilt variant
+VARIANT_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+
+@dataclass(frozen=True)
+class Asset:
+    body: bytes
+    etag: str
+    mimetype: str
+    variants: Dict[str, bytes]
+
+
+def _asset_path(name: str) -> str:
+    path = os.path.normpath(os.path.join(STATIC_DIR, name))
+    if os.path.dirname(path) != STATIC_DIR:
+        raise ValueError(f"Invalid asset name: {name}")
+    return path
+
+
+def _read_variant(path: str, encoding: str, source_mtime: float):
+    variant_path = path + VARIANT_SUFFIXES[encoding]
+    try:
+        if os.path.getmtime(variant_path) < source_mtime:
+            return None
+        with open(variant_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def load_asset(name: str) -> Asset:
+    """
+    Read a static asset and its compressed variants, once per process.
+    """
+    path = _asset_path(name)
+    with open(path, 'rb') as f:
+        body = f.read()
+    source_mtime = os.path.getmtime(path)
+
+    variants = {}
+    for encoding in available_encodings():
+        variant = _read_variant(path, encoding, source_mtime)
+        if variant is None:
+            variant = compress(body, encoding)
+        # Not worth sending if compression doesn't actually help
+        if len(variant) < len(body):
+            variants[encoding] = variant
+
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if mimetype.startswith('text/'):
+        mimetype += '; charset=utf-8'
+
+    return Asset(
+        body=body,
+        etag=hashlib.sha256(body).hexdigest()[:20],
+        mimetype=mimetype,
+        variants=variants
+    )
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def cache_control(asset: Asset) -> str:
+    if asset.mimetype.startswith('text/html'):
+        return 'no-cache'
+    return f'public, max-age={get_settings().static_max_age}'
+
+
+def send_asset(name: str):
+    """
+    Build the response for a static asset, honouring If-None-Match and Accept-Encoding.
+    """
+    from flask import Response, request
+
+    asset = load_asset(name)
+    headers = {
+        # Weak, since the same tag is shared by the identity and compressed bodies
+        'ETag': f'W/"{asset.etag}"',
+        'Cache-Control': cache_control(asset),
+        'Vary': 'Accept-Encoding',
+    }
+
+    if _etag_matches(request.headers.get('If-None-Match', ''), asset.etag):
+        return Response(status=304, headers=headers)
+
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), asset.variants)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        body = asset.variants[encoding]
+    else:
+        body = asset.body
+
+    return Response(body, content_type=asset.mimetype, headers=headers)
+
+
+def build_variants(names=None):
+    """
+    Write precompressed variants next to each asset in static/.
+    """
+    if names is None:
+        names = [
+            name for name in sorted(os.listdir(STATIC_DIR))
+            if not name.endswith(tuple(VARIANT_SUFFIXES.values()))
+        ]
+    for name in names:
+        path = _asset_path(name)
+        with open(path, 'rb') as f:
+            body = f.read()
+        for encoding in available_encodings():
+            variant = compress(body, encoding)
+            with open(path + VARIANT_SUFFIXES[encoding], 'wb') as f:
+                f.write(variant)
+            print(f"{name}{VARIANT_SUFFIXES[encoding]}: {len(body)} -> {len(variant)} bytes")
+
+
+if __name__ == '__main__':
+    build_variants(sys.argv[1:] or None)
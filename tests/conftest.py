@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from settings import reset_settings
+
+
+@pytest.fixture
+def settings_env(tmp_path, monkeypatch):
+    """
+    Settings that keep every on-disk store under tmp_path and never reach a real FHIR server.
+    """
+    env = {
+        'XPC_API_KEY': 'test-key',
+        'XPC_FHIR_API_BASE_URL': 'http://fhir.invalid/',
+        'XPC_HTTP_CACHE_PATH': '',
+        'XPC_RESULTS_PATH': str(tmp_path / 'results.sqlite'),
+        'XPC_REPORT_DIR': str(tmp_path / 'reports'),
+        'XPC_PROFILE_DIR': str(tmp_path / 'profiles'),
+    }
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    from results import get_result_store
+    reset_settings()
+    get_result_store.cache_clear()
+    yield env
+    reset_settings()
+    get_result_store.cache_clear()
+
+
+class FakeUpstream:
+    """
+    Stand-ins for the pipeline's FHIR calls, recording what was sent.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.appointments = []
+
+    def create_patient0(self, firstname, lastname, age, sex, gender, identifier=None, conditional=False):
+        self.calls.append(('create_patient', f'{firstname} {lastname}'))
+        return {'status_code': 201, 'id': f'pat-{firstname}'}
+
+    def search_patient_by_name(self, name):
+        self.calls.append(('search_patient', name))
+        return f'pat-{name.split()[0]}'
+
+    def search_practitioner_by_name(self, name):
+        self.calls.append(('search_practitioner', name))
+        return 'pract-1'
+
+    def search_appointments(self, practitioner_id, start_date, end_date):
+        return []
+
+    def create_appointment(self, patient_id, practitioner_id, reason_text, start_time, end_time,
+                           appointment_type_display):
+        self.calls.append(('create_appointment', patient_id, practitioner_id))
+        self.appointments.append((patient_id, practitioner_id, start_time))
+        appointment_id = f'appt-{len(self.appointments)}'
+        return {'status_code': 201, 'response_body': json.dumps({'id': appointment_id})}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    import pipeline
+
+    fake = FakeUpstream()
+    for name in ('create_patient0', 'search_patient_by_name', 'search_practitioner_by_name',
+                 'search_appointments', 'create_appointment'):
+        monkeypatch.setattr(pipeline, name, getattr(fake, name))
+    return fake
@@ -0,0 +1,98 @@
+import os
+import runpy
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionControl, Overloaded, job_admission, worker_share
+
+GUNICORN_CONF = os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py')
+
+
+def test_limit_admits_up_to_limit_callers():
+    control = AdmissionControl(2)
+    with control.slot(), control.slot():
+        assert control.stats()['active'] == 2
+        with pytest.raises(Overloaded):
+            with control.slot():
+                pass
+    with control.slot():
+        pass
+    assert control.stats() == {'limit': 2, 'active': 0, 'queue_depth': 0, 'admitted': 3, 'rejected': 1}
+
+
+def test_queue_is_bounded_and_waiters_get_the_freed_slot():
+    control = AdmissionControl(1, max_waiting=1, wait_timeout=5, retry_after=7)
+    admitted = []
+
+    def waiter():
+        with control.slot():
+            admitted.append(1)
+
+    with control.slot():
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        while control.stats()['queue_depth'] < 1:
+            time.sleep(0.001)
+        # The one queue place is taken, so the next caller is turned away at once
+        with pytest.raises(Overloaded) as excinfo:
+            with control.slot():
+                pass
+        assert excinfo.value.retry_after == 7
+        assert admitted == []
+    thread.join(5)
+    assert admitted == [1]
+    assert control.stats()['rejected'] == 1
+
+
+def test_waiting_times_out():
+    control = AdmissionControl(1, max_waiting=None, wait_timeout=0.01, retry_after=3)
+    with control.slot():
+        with pytest.raises(Overloaded, match='retry in 3 seconds'):
+            with control.slot():
+                pass
+    assert control.stats()['queue_depth'] == 0
+
+
+def test_worker_share(settings_env, monkeypatch):
+    from settings import reset_settings
+
+    monkeypatch.setenv('XPC_WEB_WORKERS', '4')
+    reset_settings()
+    assert worker_share(16) == 4
+    assert worker_share(2) == 1
+    assert worker_share(2, minimum=0) == 0
+
+
+def test_busy_server_answers_503_with_retry_after(settings_env, monkeypatch):
+    from app import app
+    from settings import reset_settings
+
+    monkeypatch.setenv('XPC_MAX_JOBS', '1')
+    monkeypatch.setenv('XPC_MAX_QUEUED_JOBS', '0')
+    monkeypatch.setenv('XPC_RETRY_AFTER', '9')
+    reset_settings()
+    job_admission.cache_clear()
+    try:
+        with job_admission().slot():
+            response = app.test_client().post('/process', data={})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '9'
+        assert job_admission().stats()['rejected'] == 1
+    finally:
+        job_admission.cache_clear()
+
+
+def test_gunicorn_warns_when_workers_outnumber_the_job_slots(monkeypatch, capsys):
+    monkeypatch.setenv('XPC_WORKER_CLASS', 'sync')
+    monkeypatch.setenv('XPC_MAX_JOBS', '2')
+    monkeypatch.delenv('XPC_WEB_WORKERS', raising=False)
+    config = runpy.run_path(GUNICORN_CONF)
+    assert config['workers'] <= 2
+    assert capsys.readouterr().err == ''
+
+    monkeypatch.setenv('XPC_WEB_WORKERS', '3')
+    assert runpy.run_path(GUNICORN_CONF)['workers'] == 3
+    assert 'up to 3 uploads' in capsys.readouterr().err
+    assert os.environ['XPC_WEB_WORKERS'] == '3'
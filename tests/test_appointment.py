@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+
+import appointment
+from appointment import iter_search
+
+PAGES = {
+    'http://fhir/Appointment': {
+        'resourceType': 'Bundle',
+        'entry': [{'resource': {'id': 'a1'}}, {'resource': {'id': 'a2'}}, {'search': {'mode': 'outcome'}}],
+        'link': [{'relation': 'self', 'url': 'http://fhir/Appointment?practitioner=Practitioner/7'},
+                 {'relation': 'next', 'url': 'http://fhir/Appointment?practitioner=Practitioner/7&page=2'}],
+    },
+    'http://fhir/Appointment?practitioner=Practitioner/7&page=2': {
+        'resourceType': 'Bundle',
+        'entry': [{'resource': {'id': 'a3'}}],
+        'link': [{'relation': 'self', 'url': 'http://fhir/Appointment?practitioner=Practitioner/7&page=2'}],
+    },
+}
+
+
+@pytest.fixture
+def searched(monkeypatch):
+    searched = []
+
+    def cached_get(url, params=None):
+        searched.append((url, params))
+        if url not in PAGES:
+            return SimpleNamespace(status_code=404, text='Not found')
+        return SimpleNamespace(status_code=200, json=lambda: PAGES[url])
+
+    monkeypatch.setattr(appointment, 'cached_get', cached_get)
+    return searched
+
+
+def test_search_follows_the_next_link_without_repeating_params(searched):
+    params = [('practitioner', 'Practitioner/7')]
+    assert [r['id'] for r in iter_search('http://fhir/Appointment', params)] == ['a1', 'a2', 'a3']
+    assert searched == [
+        ('http://fhir/Appointment', params),
+        # The next link already carries the search parameters
+        ('http://fhir/Appointment?practitioner=Practitioner/7&page=2', None),
+    ]
+
+
+def test_next_page_is_fetched_only_when_needed(searched):
+    resources = iter_search('http://fhir/Appointment', [('practitioner', 'Practitioner/7')])
+    assert [next(resources)['id'], next(resources)['id']] == ['a1', 'a2']
+    assert len(searched) == 1
+    assert next(resources)['id'] == 'a3'
+    assert len(searched) == 2
+
+
+def test_failed_search_names_what_was_searched(searched):
+    with pytest.raises(Exception, match='Error searching appointments: 404'):
+        list(iter_search('http://fhir/Missing', what='appointments'))
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from caching import SingleFlight
+
+CALLERS = 5
+
+
+def call_concurrently(flight, key, outcome):
+    """
+    Have CALLERS threads call flight.do(key, ...) while the first call is still running.
+
+    `outcome()` produces the leader's result or raises; returns how often it
+    ran and what each caller got, as ('value', result) or ('error', exception).
+    """
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return outcome()
+
+    results = []
+    lock = threading.Lock()
+
+    def caller():
+        try:
+            result = ('value', flight.do(key, fn))
+        except Exception as e:
+            result = ('error', e)
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=caller) for _ in range(CALLERS)]
+    threads[0].start()
+    assert started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Followers are counted as suppressed when they join the flight
+    deadline = time.monotonic() + 5
+    while flight.stats()['suppressed'] < CALLERS - 1 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return len(calls), results
+
+
+def test_concurrent_callers_share_one_result():
+    flight = SingleFlight()
+    calls, results = call_concurrently(flight, 'Dr Who', lambda: 'pract-1')
+    assert calls == 1
+    assert results == [('value', 'pract-1')] * CALLERS
+    assert flight.stats() == {'calls': CALLERS, 'suppressed': CALLERS - 1, 'in_flight': 0}
+
+
+def test_concurrent_callers_share_one_error():
+    flight = SingleFlight()
+    error = RuntimeError('503 from upstream')
+
+    def fail():
+        raise error
+
+    calls, results = call_concurrently(flight, 'Dr Who', fail)
+    assert calls == 1
+    assert results == [('error', error)] * CALLERS
+    assert flight.stats() == {'calls': CALLERS, 'suppressed': CALLERS - 1, 'in_flight': 0}
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    started = threading.Barrier(2, timeout=5)
+
+    def search(name):
+        # Both calls must be running at once to get past the barrier
+        started.wait()
+        return name
+
+    results = []
+    threads = [threading.Thread(target=lambda n=name: results.append(flight.do(n, search, n)))
+               for name in ('a', 'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert sorted(results) == ['a', 'b']
+    assert flight.stats()['suppressed'] == 0
+
+
+def test_errors_are_not_kept_after_the_call():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError('first')
+
+    with pytest.raises(RuntimeError):
+        flight.do('key', fail)
+    # The next call for the key runs again
+    assert flight.do('key', lambda: 'second') == 'second'
+    assert flight.stats() == {'calls': 2, 'suppressed': 0, 'in_flight': 0}
+
+
+def test_coalesce_keys_on_the_arguments():
+    flight = SingleFlight()
+    seen = []
+
+    @flight.coalesce
+    def lookup(name, count=1):
+        seen.append((name, count))
+        return f'{name}:{count}'
+
+    assert lookup('a') == 'a:1'
+    assert lookup('a', count=2) == 'a:2'
+    assert lookup.__name__ == 'lookup'
+    assert seen == [('a', 1), ('a', 2)]
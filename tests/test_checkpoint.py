@@ -0,0 +1,94 @@
+import itertools
+import json
+import os
+
+import pytest
+
+from checkpoint import load_checkpoint, load_created_ids, run_with_checkpoints
+
+HEADER = 'Name,Age,Gender,Sex,Type of appointment,Appointment date,Appointment time,Physician,Reason for visit\n'
+
+# Nothing is sent upstream: rows are parsed and recorded only
+OFFLINE = {'send_api': False, 'create_patients': False}
+
+
+def write_csv(path, count, trailer=''):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(HEADER)
+        for i in range(count):
+            f.write(f'Patient{i} Smith,{30 + i},female,F,Office Visit,2025-03-02,09:00:00,Dr Who,"Flu, cough"\n')
+        f.write(trailer)
+
+
+def first_names(chunks):
+    return [outcome.patient.first_name for chunk in chunks for outcome in chunk]
+
+
+def test_resume_seeks_to_the_committed_byte_offset(tmp_path):
+    csv_path, checkpoint_path = str(tmp_path / 'in.csv'), str(tmp_path / 'in.ckpt')
+    write_csv(csv_path, 5)
+
+    run = run_with_checkpoints(csv_path, checkpoint_path, chunk_size=2, **OFFLINE)
+    assert first_names([next(run)]) == ['Patient0', 'Patient1']
+    run.close()  # the run dies after its first chunk
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    assert checkpoint.rows_done == 2 and not checkpoint.complete
+    with open(csv_path, 'rb') as f:
+        data = f.read()
+    assert data[checkpoint.byte_offset:].startswith(b'Patient2 Smith,')
+
+    chunks = list(run_with_checkpoints(csv_path, checkpoint_path, resume=True, chunk_size=2, **OFFLINE))
+    assert first_names(chunks) == ['Patient2', 'Patient3', 'Patient4']
+    assert [outcome.index for chunk in chunks for outcome in chunk] == [2, 3, 4]
+    assert load_checkpoint(checkpoint_path).complete
+    assert [record['row'] for record in load_created_ids(checkpoint_path + '.ids')] == [0, 1, 2, 3, 4]
+
+
+def test_resume_at_eof_with_trailing_blank_lines(tmp_path):
+    csv_path, checkpoint_path = str(tmp_path / 'in.csv'), str(tmp_path / 'in.ckpt')
+    write_csv(csv_path, 4, trailer='\n\r\n\n')
+
+    run = run_with_checkpoints(csv_path, checkpoint_path, chunk_size=2, **OFFLINE)
+    assert len(first_names(itertools.islice(run, 2))) == 4
+    run.close()  # stopped after the last chunk, before the run was marked complete
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    assert checkpoint.rows_done == 4 and not checkpoint.complete
+    # Only blank lines are left after the committed offset
+    assert checkpoint.byte_offset < os.path.getsize(csv_path)
+
+    assert list(run_with_checkpoints(csv_path, checkpoint_path, resume=True, chunk_size=2, **OFFLINE)) == []
+    checkpoint = load_checkpoint(checkpoint_path)
+    assert checkpoint.complete and checkpoint.rows_done == 4
+    assert len(load_created_ids(checkpoint_path + '.ids')) == 4
+
+
+def test_uncommitted_ids_are_dropped_on_resume(tmp_path):
+    csv_path, checkpoint_path = str(tmp_path / 'in.csv'), str(tmp_path / 'in.ckpt')
+    write_csv(csv_path, 3)
+
+    run = run_with_checkpoints(csv_path, checkpoint_path, chunk_size=2, **OFFLINE)
+    next(run)
+    run.close()
+    # A crash between logging the next chunk's ids and committing it
+    with open(checkpoint_path + '.ids', 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'row': 2, 'patient_id': 'lost'}) + '\n')
+
+    chunks = list(run_with_checkpoints(csv_path, checkpoint_path, resume=True, chunk_size=2, **OFFLINE))
+    assert first_names(chunks) == ['Patient2']
+    records = load_created_ids(checkpoint_path + '.ids')
+    assert [record['row'] for record in records] == [0, 1, 2]
+    assert records[2]['patient_id'] is None
+
+
+def test_resume_refuses_a_changed_file(tmp_path):
+    csv_path, checkpoint_path = str(tmp_path / 'in.csv'), str(tmp_path / 'in.ckpt')
+    write_csv(csv_path, 3)
+    run = run_with_checkpoints(csv_path, checkpoint_path, chunk_size=2, **OFFLINE)
+    next(run)
+    run.close()
+
+    write_csv(csv_path, 4)
+    with pytest.raises(ValueError, match='different version'):
+        next(run_with_checkpoints(csv_path, checkpoint_path, resume=True, **OFFLINE))
@@ -0,0 +1,49 @@
+import io
+
+import pytest
+
+from columnar import iter_columnar
+from pipeline import process_patient
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.parquet  # noqa: E402
+
+
+def parquet(**columns):
+    buffer = io.BytesIO()
+    pyarrow.parquet.write_table(pa.table(columns), buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_rows_are_read_like_csv_rows():
+    row, = iter_columnar(parquet(**{
+        'Name': ['  Ann   Marie Lee '], 'Age': ['42'], 'Gender': ['Female'], 'Sex': ['f'],
+        'Appointment date': ['3/2/25'], 'Appointment time': ['9:30 AM'], 'Physician': ['Dr Who'],
+    }))
+    assert (row.first_name, row.last_name, row.age, row.gender, row.sex) == ('Ann', 'Marie Lee', 42, 'female', 'F')
+    assert (row.appointment_date, row.appointment_time, row.physician) == ('2025-03-02', '09:30:00', 'Dr Who')
+
+
+def test_rows_without_a_valid_slot_are_kept_unbooked(capsys):
+    rows = list(iter_columnar(parquet(**{
+        'Name': ['Ann Lee', 'Bob Ray', '', 'Cara Diaz'],
+        'Appointment date': ['2025-03-02', 'soon', '2025-03-02', '2025-03-02'],
+        'Appointment time': ['09:00', '10:00', '11:00', None],
+    })))
+    assert [(row.first_name, row.appointment_date, row.appointment_time) for row in rows] == [
+        ('Ann', '2025-03-02', '09:00:00'), ('Bob', '', ''), ('Cara', '', '')]
+    assert 'Skipping 1 patient rows without a name' in capsys.readouterr().out
+
+
+def test_patients_only_need_a_name_column(upstream):
+    rows = list(iter_columnar(parquet(Name=['Ann Lee'], MRN=['M1'])))
+    assert [(row.first_name, row.mrn, row.appointment_date) for row in rows] == [('Ann', 'M1', '')]
+    assert process_patient(rows[0], False) is None
+    assert upstream.calls == [('create_patient', 'Ann Lee')]
+    # Booking leaves the row unsent instead of failing the run
+    assert process_patient(rows[0], True) is None
+    assert upstream.calls == [('create_patient', 'Ann Lee')]
+
+    with pytest.raises(ValueError, match='needs at least a name column'):
+        list(iter_columnar(parquet(MRN=['M1'])))
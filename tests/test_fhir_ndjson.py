@@ -0,0 +1,134 @@
+import io
+import json
+
+import pytest
+
+from fhir_ndjson import iter_fhir_ndjson
+from pipeline import process_patient
+
+
+def patient(resource_id, given, family, **extra):
+    return dict({'resourceType': 'Patient', 'id': resource_id,
+                 'name': [{'use': 'official', 'given': [given], 'family': family}]}, **extra)
+
+
+def appointment(resource_id, patient_ref, start, practitioner=None, **extra):
+    participants = [{'actor': {'reference': f'Patient/{patient_ref}'}}]
+    if practitioner is not None:
+        participants.append({'actor': practitioner})
+    return dict({'resourceType': 'Appointment', 'id': resource_id, 'start': start,
+                 'participant': participants}, **extra)
+
+
+def ndjson(*resources):
+    return [json.dumps(resource) + '\n' for resource in resources]
+
+
+def test_appointment_is_joined_to_its_patient():
+    rows = list(iter_fhir_ndjson(ndjson(
+        patient('p1', 'Ann', 'Lee', gender='female', birthDate='1980-05-01',
+                identifier=[{'system': 'urn:mrn', 'value': 'M1'}]),
+        appointment('a1', 'p1', '2025-03-02T09:00:00Z',
+                    {'reference': 'Practitioner/77', 'display': 'Paulius Mui, MD'},
+                    appointmentType={'coding': [{'code': '308335008'}]},
+                    reasonCode=[{'text': 'Flu'}]),
+    )))
+    assert len(rows) == 1
+    row = rows[0]
+    assert (row.first_name, row.last_name, row.gender, row.sex, row.mrn) == ('Ann', 'Lee', 'female', 'F', 'M1')
+    assert row.age > 40
+    assert (row.appointment_date, row.appointment_time) == ('2025-03-02', '09:00:00')
+    assert (row.appointment_type, row.reason_for_visit) == ('Office Visit', 'Flu')
+    assert (row.physician, row.practitioner_id) == ('Paulius Mui, MD', '77')
+
+
+def test_start_is_converted_to_utc():
+    row, = iter_fhir_ndjson(ndjson(
+        patient('p1', 'Ann', 'Lee'),
+        appointment('a1', 'p1', '2025-03-02T23:30:00-05:00'),
+    ))
+    assert (row.appointment_date, row.appointment_time) == ('2025-03-03', '04:30:00')
+
+
+def test_appointment_before_its_patient_waits_for_it():
+    rows = list(iter_fhir_ndjson(ndjson(
+        appointment('a1', 'p2', '2025-03-02T09:00:00Z'),
+        patient('p1', 'Ann', 'Lee'),
+        appointment('a2', 'p1', '2025-03-02T10:00:00Z'),
+        patient('p2', 'Bob', 'Ray', gender='male'),
+    )))
+    assert [(row.first_name, row.appointment_time) for row in rows] == [('Ann', '10:00:00'), ('Bob', '09:00:00')]
+    assert rows[1].sex == 'M'
+
+
+def test_appointment_of_a_patient_never_exported_uses_the_display_name():
+    resource = appointment('a1', 'missing', '2025-03-02T09:00:00Z')
+    resource['participant'][0]['actor']['display'] = 'Cara Diaz'
+    row, = iter_fhir_ndjson(ndjson(resource))
+    assert (row.first_name, row.last_name, row.sex) == ('Cara', 'Diaz', 'UNK')
+
+
+def test_unbooked_patients_come_last_without_an_appointment():
+    rows = list(iter_fhir_ndjson(ndjson(
+        patient('p1', 'Ann', 'Lee'),
+        patient('p2', 'Bob', 'Ray'),
+        appointment('a1', 'p1', '2025-03-02T09:00:00Z', {'type': 'Practitioner', 'display': 'Dr Who'}),
+    )))
+    assert [row.first_name for row in rows] == ['Ann', 'Bob']
+    assert (rows[0].physician, rows[0].practitioner_id) == ('Dr Who', '')
+    unbooked = rows[1]
+    assert (unbooked.appointment_date, unbooked.appointment_time, unbooked.physician) == ('', '', '')
+
+
+def test_stream_is_read_lazily():
+    def lines():
+        yield from ndjson(patient('p1', 'Ann', 'Lee'), appointment('a1', 'p1', '2025-03-02T09:00:00Z'))
+        raise AssertionError('read past the first appointment')
+
+    assert next(iter_fhir_ndjson(lines())).first_name == 'Ann'
+
+
+def test_bad_lines_name_their_line_number():
+    with pytest.raises(ValueError, match='Line 2: invalid JSON'):
+        list(iter_fhir_ndjson(['\n', '{not json\n']))
+    with pytest.raises(ValueError, match='Line 1: Appointment a1 has no start'):
+        list(iter_fhir_ndjson(ndjson({'resourceType': 'Appointment', 'id': 'a1'})))
+
+
+def test_practitioner_reference_skips_the_name_search(upstream):
+    row, = iter_fhir_ndjson(ndjson(
+        patient('p1', 'Ann', 'Lee'),
+        appointment('a1', 'p1', '2025-03-02T09:00:00Z', {'reference': 'Practitioner/77', 'display': 'Dr Who'}),
+    ))
+    item = process_patient(row, True)
+    assert item['practitioner_id'] == '77'
+    assert ('search_practitioner', 'Dr Who') not in upstream.calls
+    assert upstream.appointments[0][1] == '77'
+
+
+def test_unbooked_patient_is_not_sent_when_booking(upstream):
+    rows = list(iter_fhir_ndjson(ndjson(patient('p1', 'Ann', 'Lee'))))
+    assert process_patient(rows[0], True) is None
+    assert upstream.calls == []
+    # Without appointments the patient is created
+    assert process_patient(rows[0], False) is None
+    assert upstream.calls == [('create_patient', 'Ann Lee')]
+
+
+def test_process_books_an_export_with_an_unbooked_patient(settings_env, upstream):
+    from app import app
+
+    body = ''.join(ndjson(
+        patient('p1', 'Ann', 'Lee'),
+        patient('p2', 'Bob', 'Ray'),
+        appointment('a1', 'p1', '2025-03-02T09:00:00Z', {'reference': 'Practitioner/77'}),
+    )).encode()
+    response = app.test_client().post('/process', data={
+        'send_api': 'true', 'csv_file': (io.BytesIO(body), 'export.ndjson')
+    })
+    result = response.get_json()
+    assert result['success'] and result['count'] == 1
+    assert [item['appointment_id'] for item in result['data']] == ['appt-1']
+
+    page = app.test_client().get(f"/results?run_id={result['run_id']}").get_json()
+    assert [row['status'] for row in page['results']] == ['sent', 'not_sent']
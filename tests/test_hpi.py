@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+
+import hpi
+from hpi import hpi_rows_from_notes, iter_hpi_commands, normalize_narrative
+
+
+@pytest.fixture(autouse=True)
+def commands(monkeypatch):
+    # canvas_sdk isn't needed to check which commands are built
+    monkeypatch.setattr(hpi, 'create_hpi', lambda note_uuid, narrative: (note_uuid, narrative))
+
+
+def test_normalize_narrative():
+    assert normalize_narrative('  Chronic\tback pain\n and  headaches ') == 'Chronic back pain and headaches'
+    assert normalize_narrative(None) == ''
+    assert normalize_narrative(' \n ') == ''
+
+
+def test_every_note_gets_a_command_and_blank_rows_are_skipped():
+    commands = list(iter_hpi_commands([
+        ('n1', 'Flu'), ('n2', ' Flu '), ('', 'Flu'), ('n3', '  '), ('n4', None), ('n1', 'Back  pain'),
+    ]))
+    assert commands == [('n1', 'Flu'), ('n2', 'Flu'), ('n1', 'Back pain')]
+
+
+def test_identical_narratives_share_one_string():
+    first, second, other = iter_hpi_commands([
+        ('n1', 'Chronic back pain'), ('n2', 'Chronic  back pain '), ('n3', 'Flu'),
+    ])
+    assert first[1] is second[1]
+    assert other[1] == 'Flu'
+
+
+def test_only_recent_narratives_are_kept():
+    rows = [('n1', 'Flu x'), ('n2', 'Cold x'), ('n3', 'Flu  x'), ('n4', 'Back x'), ('n5', 'Cold  x')]
+    flu1, cold1, flu2, _, cold2 = iter_hpi_commands(rows, max_narratives=2)
+    # Flu was used again before Back arrived, so Cold was the one forgotten
+    assert flu1[1] is flu2[1]
+    assert cold1[1] is not cold2[1] and cold1[1] == cold2[1]
+
+
+def test_rows_are_read_lazily():
+    def rows():
+        yield 'n1', 'Flu'
+        raise AssertionError('read past the first row')
+
+    assert next(iter_hpi_commands(rows())) == ('n1', 'Flu')
+
+
+def test_rows_come_from_created_notes_only():
+    outcomes = [
+        SimpleNamespace(ok=True, note_id='n1', spec=SimpleNamespace(title='Flu')),
+        SimpleNamespace(ok=False, note_id=None, spec=SimpleNamespace(title='Cold')),
+        SimpleNamespace(ok=True, note_id='', spec=SimpleNamespace(title='Cold')),
+    ]
+    assert list(hpi_rows_from_notes(outcomes)) == [('n1', 'Flu')]
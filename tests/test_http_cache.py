@@ -0,0 +1,85 @@
+import os
+import stat
+from types import SimpleNamespace
+
+import pytest
+
+import http_client
+from http_cache import CachedEntry, ResponseCache
+
+HEADERS = {'Accept': 'application/fhir+json'}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache' / 'http-cache.sqlite'), max_bytes=10)
+    yield cache
+    cache.close()
+
+
+def entry(body, etag='"v1"'):
+    return CachedEntry(etag, None, 'application/fhir+json', body)
+
+
+def test_cache_file_is_private(cache, tmp_path):
+    assert stat.S_IMODE(os.stat(tmp_path / 'cache').st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr('http_cache.time.time', lambda: next(clock))
+    cache.put('a', entry(b'aaaa'))
+    cache.put('b', entry(b'bbbb'))
+    cache.touch('a', 4)
+    cache.put('c', entry(b'cccc'))
+    # b was used least recently; a was revalidated after it was stored
+    assert cache.get('b') is None
+    assert cache.get('a').body == b'aaaa' and cache.get('c').body == b'cccc'
+    assert cache.stats()['size_bytes'] == 8
+    # A body larger than the whole cache is not stored
+    cache.put('d', entry(b'd' * 11))
+    assert cache.get('d') is None and cache.get('a') is not None
+
+
+class Upstream:
+    """
+    Answers http_client.send() with the queued responses, recording the request headers.
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.headers = []
+
+    def __call__(self, method, url, params=None, headers=None, **kwargs):
+        self.headers.append(headers)
+        return self.responses.pop(0)
+
+
+def response(status_code, content=b'', **headers):
+    return SimpleNamespace(status_code=status_code, content=content, headers=headers)
+
+
+def test_not_modified_is_answered_from_the_cache(cache, monkeypatch):
+    upstream = Upstream(response(200, b'{"n": 1}', ETag='"v1"'), response(304))
+    monkeypatch.setattr(http_client, '_cache', cache)
+    monkeypatch.setattr(http_client, 'send', upstream)
+
+    assert http_client.cached_get('http://fhir/Patient', {'name': 'Ann'}, HEADERS).content == b'{"n": 1}'
+    cached = http_client.cached_get('http://fhir/Patient', {'name': 'Ann'}, HEADERS)
+    assert cached.json() == {'n': 1}
+    assert upstream.headers[1]['If-None-Match'] == '"v1"'
+    assert cache.stats()['hits'] == 1 and cache.stats()['bytes_saved'] == 8
+
+
+def test_a_response_without_validators_discards_the_entry(cache, monkeypatch):
+    upstream = Upstream(response(200, b'{"n": 2}', ETag='"v1"'), response(200, b'{"n": 3}'))
+    monkeypatch.setattr(http_client, '_cache', cache)
+    monkeypatch.setattr(http_client, 'send', upstream)
+
+    http_client.cached_get('http://fhir/Patient', headers=HEADERS)
+    fresh = http_client.cached_get('http://fhir/Patient', headers=HEADERS)
+    assert fresh.content == b'{"n": 3}'
+    # The stale entry can't be revalidated any more, so it is dropped
+    assert cache.get('http://fhir/Patient') is None
+    assert cache.stats()['misses'] == 2
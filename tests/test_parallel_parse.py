@@ -0,0 +1,109 @@
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from parallel_parse import bounded_map, iter_csv_parallel, next_record_boundary, split_ranges
+
+HEADER = 'Name,Age,Gender,Sex,Type of appointment,Appointment date,Appointment time,Physician,Reason for visit\n'
+
+
+def quoted_rows(count):
+    """
+    Rows whose reason for visit is quoted, often over several lines and with doubled quotes.
+    """
+    rows = []
+    for i in range(count):
+        reason = f'Follow-up {i}'
+        if i % 3 == 0:
+            reason = f'Line one of {i}\nline two, "quoted"\nline three'
+        elif i % 3 == 1:
+            reason = f'Says ""{i}""'
+        rows.append([f'Patient{i} Smith', str(20 + i % 60), 'female', 'F', 'Office Visit',
+                     '2025-03-02', '09:00:00', 'Dr Who', reason])
+    return rows
+
+
+def write_rows(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(HEADER)
+        csv.writer(f, lineterminator='\n').writerows(rows)
+
+
+def test_boundary_skips_newlines_inside_quotes():
+    data = b'a,"x\ny"\nb,c\n'
+    assert next_record_boundary(data, 0, False, len(data)) == 8
+    # A cut inside the quoted field knows it from the parity of the quotes before it
+    assert next_record_boundary(data, 3, True, len(data)) == 8
+    assert next_record_boundary(data, 8, False, len(data)) == len(data)
+
+
+def test_boundary_with_doubled_quotes():
+    data = b'a,"he said ""hi""\nthen left",x\nb,c\n'
+    first = data.index(b'x\n') + 2
+    assert next_record_boundary(data, 0, False, len(data)) == first
+    # Between the doubled quotes parity is odd again, i.e. still quoted
+    cut = data.index(b'hi')
+    assert next_record_boundary(data, cut, data[:cut].count(b'"') % 2 == 1, len(data)) == first
+
+
+def test_boundary_without_a_final_newline():
+    data = b'a,"x\ny'
+    assert next_record_boundary(data, 0, False, len(data)) == len(data)
+
+
+@pytest.mark.parametrize('parts', [2, 3, 7, 16, 64])
+def test_ranges_cut_only_between_records(tmp_path, parts):
+    path = str(tmp_path / 'in.csv')
+    rows = quoted_rows(200)
+    write_rows(path, rows)
+    data_start = len(HEADER)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        ranges = split_ranges(path, data_start, parts, executor)
+
+    assert ranges[0][0] == data_start
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert ranges[-1][1] == len(data)
+
+    parsed = []
+    for start, end in ranges:
+        parsed.extend(csv.reader(io.StringIO(data[start:end].decode('utf-8'), newline='')))
+    assert parsed == rows
+
+
+def test_parallel_parse_matches_sequential(tmp_path):
+    path = str(tmp_path / 'in.csv')
+    write_rows(path, quoted_rows(300))
+
+    sequential = list(iter_csv_parallel(path, workers=1))
+    assert len(sequential) == 300
+    assert list(iter_csv_parallel(path, workers=2, min_parallel_bytes=0)) == sequential
+
+
+def test_bounded_map_submits_ahead_of_the_consumer_only():
+    pulled = []
+
+    def items():
+        for i in range(100):
+            pulled.append(i)
+            yield i
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = bounded_map(executor, lambda i: i * i, items(), in_flight=3)
+        assert next(results) == 0
+        # Three submitted up front, one more for each result taken
+        assert len(pulled) == 4
+        assert list(results) == [i * i for i in range(1, 100)]
+
+
+def test_parallel_parse_with_small_ranges(tmp_path, monkeypatch):
+    import parallel_parse
+
+    path = str(tmp_path / 'in.csv')
+    write_rows(path, quoted_rows(300))
+    monkeypatch.setattr(parallel_parse, 'MAX_RANGE_BYTES', 512)
+    assert list(iter_csv_parallel(path, workers=2, min_parallel_bytes=0)) == list(iter_csv_parallel(path, workers=1))
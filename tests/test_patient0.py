@@ -0,0 +1,78 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import patient0
+from patient0 import create_patient0, patient_id_from_location
+
+
+@pytest.mark.parametrize('location, patient_id', [
+    ('http://fhir/Patient/123/_history/1', '123'),
+    ('http://fhir/Patient/123', '123'),
+    ('Patient/123/', '123'),
+    ('http://fhir/Patient/', None),
+    ('http://fhir/Practitioner/9', None),
+    ('', None),
+    (None, None),
+])
+def test_patient_id_from_location(location, patient_id):
+    assert patient_id_from_location(location) == patient_id
+
+
+class Server:
+    """
+    Answers patient0.send() with one response, keeping the request.
+    """
+
+    def __init__(self, status_code, body=None, location=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = {'Location': location} if location else {}
+        self.requests = []
+
+    def __call__(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs['headers'], kwargs['json']))
+        text = '' if self.body is None else json.dumps(self.body)
+        return SimpleNamespace(status_code=self.status_code, text=text, headers=self.headers,
+                               json=lambda: json.loads(text))
+
+
+def create(server, monkeypatch, identifier='M1', conditional=True):
+    from settings import reset_settings
+
+    monkeypatch.delenv('XPC_PATIENT_IDENTIFIER_SYSTEM', raising=False)
+    reset_settings()
+    monkeypatch.setattr(patient0, 'send', server)
+    return create_patient0('Ann', 'Lee', 40, 'F', 'female', identifier, conditional)
+
+
+def test_conditional_create_sends_if_none_exist(settings_env, monkeypatch):
+    server = Server(201, {'resourceType': 'Patient', 'id': 'p1'})
+    assert create(server, monkeypatch)['id'] == 'p1'
+    _, _, headers, payload = server.requests[0]
+    assert headers['If-None-Exist'] == 'identifier=M1'
+    assert payload['identifier'] == [{'value': 'M1'}]
+
+
+def test_existing_patient_is_taken_from_the_location(settings_env, monkeypatch):
+    server = Server(200, location='http://fhir.invalid/Patient/123/_history/1')
+    assert create(server, monkeypatch) == {'status_code': 200, 'id': '123'}
+
+
+def test_created_patient_without_a_body_is_taken_from_the_location(settings_env, monkeypatch):
+    server = Server(201, location='http://fhir.invalid/Patient/456/_history/1')
+    assert create(server, monkeypatch) == {'status_code': 201, 'id': '456'}
+
+
+def test_several_matches_fail_the_row(settings_env, monkeypatch):
+    server = Server(412, {'resourceType': 'OperationOutcome'})
+    with pytest.raises(Exception, match='Error creating patient: 412'):
+        create(server, monkeypatch)
+
+
+def test_without_an_identifier_the_create_is_unconditional(settings_env, monkeypatch):
+    server = Server(201, {'resourceType': 'Patient', 'id': 'p2'})
+    assert create(server, monkeypatch, identifier=None)['id'] == 'p2'
+    _, _, headers, payload = server.requests[0]
+    assert 'If-None-Exist' not in headers and 'identifier' not in payload
@@ -0,0 +1,39 @@
+import io
+from types import SimpleNamespace
+
+import http_client
+from admission import job_admission
+from note import NoteSpec, create_notes
+from profiling import RequestProfile, current_profile
+
+
+class Session:
+    def request(self, method, url, **kwargs):
+        return SimpleNamespace(status_code=201, text='{"id": "note-1"}')
+
+
+def test_note_requests_are_recorded_in_the_callers_profile(settings_env, monkeypatch):
+    monkeypatch.setattr(http_client, '_session', Session())
+    specs = [NoteSpec('pat-1', 'pract-1', f'2025-03-02T0{hour}:00:00.000Z') for hour in range(6)]
+    with RequestProfile('/process') as profile:
+        outcomes = list(create_notes(specs, workers=3))
+    assert [outcome.note_id for outcome in outcomes] == ['note-1'] * 6
+    assert [stats['calls'] for stats in profile.upstream.values()] == [6]
+    assert current_profile() is None
+
+
+def test_profiling_is_refused_while_other_uploads_run(settings_env, monkeypatch):
+    from app import app
+    from settings import reset_settings
+
+    monkeypatch.setenv('XPC_PROFILE_TOKEN', 'secret')
+    reset_settings()
+    job_admission.cache_clear()
+    try:
+        with job_admission().slot():
+            response = app.test_client().post('/process', headers={'X-Profile-Token': 'secret'},
+                                              data={'csv_file': (io.BytesIO(b'Name\n'), 'empty.csv')})
+        assert response.status_code == 409
+        assert 'X-Profile-Report' not in response.headers
+    finally:
+        job_admission.cache_clear()
@@ -0,0 +1,74 @@
+import csv
+import io
+import os
+
+import pytest
+
+from reports import REPORT_COLUMNS, ReportWriter, cell, prune_reports, report_path
+
+HEADER = 'Name,Age,Gender,Sex,Type of appointment,Appointment date,Appointment time,Physician,Reason for visit\n'
+
+
+@pytest.mark.parametrize('value, written', [
+    ('=1+1', "'=1+1"),
+    (' =1', "' =1"),
+    ('  @SUM(A1)', "'  @SUM(A1)"),
+    ('\t-2', "'\t-2"),
+    ('-', "'-"),
+    ('Ann = Lee', 'Ann = Lee'),
+    ('Flu', 'Flu'),
+    ('', ''),
+    (-2, -2),
+    (None, None),
+])
+def test_cell(value, written):
+    assert cell(value) == written
+
+
+def test_writer_quotes_formulas_in_every_column(tmp_path):
+    writer = ReportWriter(str(tmp_path / 'run.csv'))
+    writer.write(0, 'a.csv', {'first_name': '=HYPERLINK("x")', 'age': 30}, 'failed', 500, None, None, ' +err')
+    writer.close()
+    with open(tmp_path / 'run.csv', newline='', encoding='utf-8') as f:
+        header, row = list(csv.reader(f))
+    assert tuple(header) == REPORT_COLUMNS
+    row = dict(zip(header, row))
+    assert (row['row'], row['source'], row['age'], row['status_code']) == ('1', 'a.csv', '30', '500')
+    assert row['first_name'] == "'=HYPERLINK(\"x\")"
+    assert row['error'] == "' +err"
+
+
+def test_only_existing_hex_reports_are_found(tmp_path):
+    ReportWriter(str(tmp_path / 'abc123.csv')).close()
+    assert report_path(str(tmp_path), 'abc123') == str(tmp_path / 'abc123.csv')
+    assert report_path(str(tmp_path), 'fff000') is None
+    assert report_path(str(tmp_path), '..') is None
+
+
+def test_prune_keeps_the_newest_reports(tmp_path):
+    for age, name in enumerate(['c', 'b', 'a']):
+        path = tmp_path / f'{name}.csv'
+        path.write_text('')
+        os.utime(path, (1000 - age, 1000 - age))
+    prune_reports(str(tmp_path), 2)
+    assert sorted(os.listdir(tmp_path)) == ['b.csv', 'c.csv']
+    prune_reports(str(tmp_path / 'missing'), 2)
+
+
+def test_report_of_a_run_is_downloaded(settings_env, upstream):
+    from app import app
+
+    body = (HEADER + 'Ann Lee,30,female,F,Office Visit,2025-03-02,09:00:00,Dr Who,=cmd\n').encode()
+    result = app.test_client().post('/process', data={
+        'send_api': 'true', 'csv_file': (io.BytesIO(body), 'visits.csv')
+    }).get_json()
+    response = app.test_client().get(result['report_url'])
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == f'attachment; filename="run-{result["run_id"]}.csv"'
+    header, row = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    row = dict(zip(header, row))
+    assert (row['first_name'], row['status'], row['appointment_id']) == ('Ann', 'sent', 'appt-1')
+    assert row['reason_for_visit'] == "'=cmd"
+
+    assert app.test_client().get('/reports/0123abcd').status_code == 404
@@ -0,0 +1,37 @@
+import os
+import stat
+
+from reports import ReportWriter
+from results import ResultStore
+from settings import private_dir
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_results_requires_a_run_id(settings_env):
+    from app import app
+
+    response = app.test_client().get('/results')
+    assert response.status_code == 400
+    assert app.test_client().get('/results?run_id=missing').status_code == 404
+
+
+def test_private_dir_is_tightened_to_its_owner(tmp_path):
+    path = tmp_path / 'data'
+    path.mkdir(mode=0o755)
+    os.chmod(path, 0o755)
+    assert private_dir(str(path)) == str(path)
+    assert mode(path) == 0o700
+    assert mode(private_dir(str(tmp_path / 'new' / 'data'))) == 0o700
+
+
+def test_store_and_report_are_readable_by_their_owner_only(tmp_path):
+    data_dir = tmp_path / 'data'
+    ResultStore(str(data_dir / 'results.sqlite'))
+    ReportWriter(str(data_dir / 'reports' / 'run.csv')).close()
+    assert mode(data_dir) == 0o700
+    assert mode(data_dir / 'results.sqlite') == 0o600
+    assert mode(data_dir / 'reports') == 0o700
+    assert mode(data_dir / 'reports' / 'run.csv') == 0o600
@@ -0,0 +1,156 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from schedule import IntervalSet, ScheduleIndex
+
+
+def at(hour, minute=0):
+    return datetime(2025, 3, 2, hour, minute, tzinfo=timezone.utc)
+
+
+def intervals(interval_set):
+    return list(zip(interval_set._starts, interval_set._ends))
+
+
+def test_add_keeps_disjoint_intervals_sorted():
+    slots = IntervalSet()
+    slots.add(at(13), at(14))
+    slots.add(at(9), at(10))
+    slots.add(at(11), at(12))
+    assert intervals(slots) == [(at(9), at(10)), (at(11), at(12)), (at(13), at(14))]
+
+
+def test_add_merges_overlapping_intervals():
+    slots = IntervalSet()
+    slots.add(at(9), at(10))
+    slots.add(at(11), at(12))
+    slots.add(at(13), at(14))
+    # Bridges the first two, leaves the third alone
+    slots.add(at(9, 30), at(11, 30))
+    assert intervals(slots) == [(at(9), at(12)), (at(13), at(14))]
+    # Covers everything
+    slots.add(at(8), at(15))
+    assert intervals(slots) == [(at(8), at(15))]
+
+
+def test_touching_intervals_are_not_merged():
+    slots = IntervalSet()
+    slots.add(at(9), at(10))
+    slots.add(at(10), at(11))
+    assert len(slots) == 2
+    assert slots.find_overlap(at(10), at(10, 30)) == (at(10), at(11))
+    assert slots.find_overlap(at(8), at(9)) is None
+
+
+def test_find_overlap():
+    slots = IntervalSet()
+    slots.add(at(9), at(10))
+    slots.add(at(12), at(13))
+    assert slots.find_overlap(at(9, 30), at(9, 45)) == (at(9), at(10))
+    assert slots.find_overlap(at(11), at(12, 15)) == (at(12), at(13))
+    assert slots.find_overlap(at(10), at(12)) is None
+
+
+def test_remove_releases_an_unmerged_interval():
+    slots = IntervalSet()
+    slots.add(at(9), at(10))
+    slots.add(at(11), at(12))
+    assert slots.remove(at(9), at(10))
+    assert intervals(slots) == [(at(11), at(12))]
+    assert not slots.remove(at(9), at(10))
+
+
+def test_remove_keeps_merged_intervals():
+    slots = IntervalSet()
+    slots.add(at(9), at(10))
+    slots.add(at(9, 30), at(11))
+    # The merged interval also covers time booked by the other one, so it stays
+    assert not slots.remove(at(9, 30), at(11))
+    assert not slots.remove(at(9), at(10))
+    assert intervals(slots) == [(at(9), at(11))]
+
+
+def test_reserve_and_release():
+    schedule = ScheduleIndex()
+    assert schedule.reserve('p1', at(9), at(10)) is None
+    assert schedule.reserve('p1', at(9, 30), at(10, 30)) == (at(9), at(10))
+    assert schedule.reserve('p2', at(9), at(10)) is None
+    schedule.release('p1', at(9), at(10))
+    assert schedule.reserve('p1', at(9, 30), at(10, 30)) is None
+    assert schedule.conflicts == 1
+
+
+def test_seeds_each_practitioner_day_once():
+    calls = []
+
+    def load(practitioner_id, start_date, end_date):
+        calls.append((practitioner_id, start_date, end_date))
+        return [
+            {'status': 'booked', 'start': '2025-03-02T09:00:00.000Z', 'end': '2025-03-02T10:00:00.000Z'},
+            {'status': 'cancelled', 'start': '2025-03-02T11:00:00Z', 'end': '2025-03-02T12:00:00Z'},
+            {'status': 'booked', 'start': '2025-03-02T14:00:00+01:00', 'end': '2025-03-02T15:00:00+01:00'},
+        ]
+
+    schedule = ScheduleIndex(load)
+    assert schedule.reserve('p1', at(9, 30), at(10, 30)) == (at(9), at(10))
+    assert schedule.reserve('p1', at(11), at(12)) is None
+    assert schedule.reserve('p1', at(13), at(13, 30)) == (at(13), at(14))
+    assert calls == [('p1', '2025-03-02', '2025-03-03')]
+
+
+def test_failed_seeding_falls_back_to_the_current_run(capsys):
+    calls = []
+
+    def load(practitioner_id, start_date, end_date):
+        calls.append(practitioner_id)
+        raise RuntimeError('403 Forbidden')
+
+    schedule = ScheduleIndex(load)
+    assert schedule.reserve('p1', at(9), at(10)) is None
+    assert schedule.reserve('p1', at(9), at(10)) == (at(9), at(10))
+    assert schedule.reserve('p1', at(11), at(12)) is None
+    assert calls == ['p1']
+    assert capsys.readouterr().out.count('403 Forbidden') == 1
+
+
+def test_slot_past_midnight_seeds_both_days():
+    calls = []
+
+    def load(practitioner_id, start_date, end_date):
+        calls.append(start_date)
+        if start_date == '2025-03-03':
+            return [{'status': 'booked', 'start': '2025-03-03T00:00:00Z', 'end': '2025-03-03T01:00:00Z'}]
+        return []
+
+    schedule = ScheduleIndex(load)
+    late = datetime(2025, 3, 2, 23, 30, tzinfo=timezone.utc)
+    assert schedule.reserve('p1', late, late + timedelta(hours=1)) == (at(0) + timedelta(days=1),
+                                                                       at(1) + timedelta(days=1))
+    assert calls == ['2025-03-02', '2025-03-03']
+    # Ending exactly at midnight stays within the day
+    assert schedule.reserve('p2', at(23), at(0) + timedelta(days=1)) is None
+    assert calls == ['2025-03-02', '2025-03-03', '2025-03-02']
+
+
+def test_each_practitioner_day_is_loaded_once_and_others_in_parallel():
+    both_loading = threading.Barrier(2, timeout=2)
+    calls, loaded_together = [], []
+
+    def load(practitioner_id, start_date, end_date):
+        calls.append(practitioner_id)
+        # Both practitioners must be loading at once to get past the barrier
+        both_loading.wait()
+        loaded_together.append(practitioner_id)
+        return []
+
+    schedule = ScheduleIndex(load)
+    results = []
+    threads = [threading.Thread(target=lambda p=p, h=h: results.append(schedule.reserve(p, at(h), at(h + 1))))
+               for p, h in (('p1', 9), ('p2', 9), ('p1', 11), ('p2', 11))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert results == [None] * 4
+    assert sorted(calls) == ['p1', 'p2']
+    assert sorted(loaded_together) == ['p1', 'p2']
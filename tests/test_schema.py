@@ -0,0 +1,56 @@
+import csv
+import io
+
+from csv_parser import Patient, parse_medical_csv
+from interface import Person, parse_csv_content
+from schema import Field, Schema, int_or_zero
+
+HEADER = 'Name,Age,Gender,Sex,Type of appointment,Appointment date,Appointment time,Physician,Reason for visit'
+
+
+def test_row_based_file():
+    patients = parse_medical_csv(HEADER + '\n'
+                                 ' Mary Ann  Smith ,25,female,F,Phone Call,2025-03-02,13:00:00,Dr Who,Flu\n'
+                                 ',,,,,,,,\n')
+    assert patients == [Patient('Mary', 'Ann Smith', 25, 'female', 'F', 'Phone Call', '2025-03-02', '13:00:00',
+                                'Dr Who', 'Flu', '')]
+
+
+def test_column_based_file():
+    content = ('Name,,Mary Smith,John Doe\n'
+               'Age,,25,40\n'
+               'Gender,,female,male\n'
+               'Appointment date,,2025-03-02,2025-03-03\n')
+    patients = parse_medical_csv(content)
+    assert [(p.first_name, p.last_name, p.age, p.gender, p.appointment_date) for p in patients] == [
+        ('Mary', 'Smith', 25, 'female', '2025-03-02'), ('John', 'Doe', 40, 'male', '2025-03-03')]
+
+
+def test_missing_headers_get_their_defaults():
+    patient, = parse_medical_csv('Name,Gender,Age\nMary Smith,female,\n')
+    assert (patient.age, patient.sex, patient.physician, patient.mrn) == (0, '', '', '')
+    assert Schema([Field('a'), Field('b')], build=tuple).compile(['A']).missing_fields == ['b']
+
+
+def test_duplicate_headers_take_the_last_column():
+    patient, = parse_medical_csv('Name,Age,Gender,Age\nMary Smith,25,female,30\n')
+    assert patient.age == 30
+
+
+def test_bad_integers(capsys):
+    # The lenient patient age becomes 0
+    patient, = parse_medical_csv('Name,Age,Gender\nMary Smith,old,female\n')
+    assert patient.age == 0
+    assert int_or_zero('') == 0
+    # A strict int field drops the row and reports it
+    people = parse_csv_content('id,name,age,email\n1,Jane,x,\n2,John,40,john@example.com\n')
+    assert people == [Person(2, 'John', 40, 'john@example.com')]
+    out = capsys.readouterr().out
+    assert 'Invalid integer value: old' in out and "Error parsing person row ['1', 'Jane', 'x', '']" in out
+
+
+def test_parse_rows_matches_csv_dict_reader():
+    content = 'email,age,id,name\njane@example.com,25,1,Jane\n,30,2,John\n'
+    expected = [Person(int(row['id']), row['name'], int(row['age']), row['email'] or None)
+                for row in csv.DictReader(io.StringIO(content))]
+    assert parse_csv_content(content) == expected
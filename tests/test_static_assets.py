@@ -0,0 +1,37 @@
+import pytest
+
+import static_assets
+from settings import reset_settings
+
+
+@pytest.fixture
+def client(settings_env, monkeypatch):
+    from app import app
+
+    monkeypatch.setenv('XPC_STATIC_MAX_AGE', '600')
+    reset_settings()
+    static_assets.load_asset.cache_clear()
+    yield app.test_client()
+    static_assets.load_asset.cache_clear()
+
+
+def test_page_is_revalidated_on_every_load(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    etag = response.headers['ETag']
+    revalidated = client.get('/', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['Cache-Control'] == 'no-cache'
+    assert revalidated.get_data() == b''
+
+
+def test_other_assets_keep_the_long_max_age(client, tmp_path, monkeypatch):
+    (tmp_path / 'app.3f2a9c.js').write_text('console.log(1)\n')
+    monkeypatch.setattr(static_assets, 'STATIC_DIR', str(tmp_path))
+    from app import app
+
+    with app.test_request_context('/static/app.3f2a9c.js'):
+        response = static_assets.send_asset('app.3f2a9c.js')
+    assert response.headers['Cache-Control'] == 'public, max-age=600'
+    assert response.mimetype in ('text/javascript', 'application/javascript')
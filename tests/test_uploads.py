@@ -0,0 +1,123 @@
+import codecs
+import io
+import tempfile
+import types
+
+import pytest
+
+from uploads import UploadTooLarge, sniff_encoding, spool_upload
+
+HEADER = 'Name,Age,Gender,Sex,Type of appointment,Appointment date,Appointment time,Physician,Reason for visit\n'
+
+
+@pytest.mark.parametrize('bom, encoding', [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+])
+def test_bom_wins(bom, encoding):
+    assert sniff_encoding(bom + b'Name,Age\n') == encoding
+
+
+def test_utf8():
+    assert sniff_encoding('Name\nRené Müller\n'.encode('utf-8'), complete=True) == 'utf-8'
+
+
+def test_utf8_prefix_cut_inside_a_character():
+    sample = 'José'.encode('utf-8')[:-1]
+    assert sniff_encoding(sample) == 'utf-8'
+    # The same bytes as a whole file are not valid UTF-8
+    assert sniff_encoding(sample, complete=True) == 'cp1252'
+
+
+def test_cp1252():
+    # Curly quotes and the euro sign are cp1252-only
+    assert sniff_encoding('“Flu” €5\n'.encode('cp1252'), complete=True) == 'cp1252'
+
+
+def test_latin1_when_cp1252_cannot_decode():
+    # 0x81 is unassigned in cp1252
+    assert sniff_encoding(b'Ren\xe9 \x81\n', complete=True) == 'latin-1'
+
+
+def test_small_upload_stays_in_memory():
+    with spool_upload(io.BytesIO(b'a,b\n1,2\n'), spool_threshold=1024) as upload:
+        assert not upload.on_disk
+        assert upload.size == 8
+        assert upload.open_text().read() == 'a,b\n1,2\n'
+
+
+def test_upload_moves_to_disk_when_crossing_the_threshold(monkeypatch):
+    import uploads
+
+    monkeypatch.setattr(uploads, 'COPY_CHUNK_BYTES', 4)
+    data = b'0123456789' * 3
+    with spool_upload(io.BytesIO(data), spool_threshold=10) as upload:
+        assert upload.on_disk
+        assert upload.size == len(data)
+        assert bytes(upload.view()) == data
+        assert upload.open_binary().read() == data
+
+
+def test_upload_over_the_limit_is_refused():
+    with pytest.raises(UploadTooLarge):
+        spool_upload(io.BytesIO(b'x' * 11), spool_threshold=4, max_bytes=10)
+    with spool_upload(io.BytesIO(b'x' * 10), spool_threshold=4, max_bytes=10) as upload:
+        assert upload.size == 10
+
+
+def test_file_stream_is_mapped_in_place():
+    with tempfile.TemporaryFile() as f:
+        f.write(HEADER.encode() + 'René,30\n'.encode('cp1252'))
+        f.seek(0)
+        upload = spool_upload(f, spool_threshold=4)
+        assert upload.on_disk and upload.size == len(HEADER) + 8
+        assert upload.open_text().read().endswith('René,30\n')
+        upload.close()
+        # The caller's file is left open
+        assert not f.closed
+        f.seek(0)
+        with pytest.raises(UploadTooLarge):
+            spool_upload(f, spool_threshold=4, max_bytes=10)
+
+
+def test_in_memory_spooled_file_is_copied_not_rolled_over():
+    with tempfile.SpooledTemporaryFile(max_size=1024) as f:
+        f.write(b'a,b\n')
+        f.seek(0)
+        with spool_upload(f, spool_threshold=1024) as upload:
+            assert not upload.on_disk
+            assert upload.open_text().read() == 'a,b\n'
+        assert not f._rolled
+
+
+def test_process_reads_a_large_upload_without_copying_it(settings_env, monkeypatch):
+    import app as app_module
+    import uploads
+
+    copies = []
+
+    def temporary_file(*args, **kwargs):
+        copies.append(1)
+        return tempfile.TemporaryFile(*args, **kwargs)
+
+    rows = ''.join(f'Patient{i} Smith,30,female,F,Office Visit,2025-03-02,09:00:00,Dr Who,Flu\n'
+                   for i in range(20000))
+    body = (HEADER + rows).encode()
+    assert len(body) > 1024 * 1024
+    monkeypatch.setenv('XPC_UPLOAD_SPOOL_BYTES', '1024')
+    monkeypatch.setenv('XPC_MAX_RESPONSE_ROWS', '10')
+    # Only the copies made by uploads.py; Werkzeug spools through tempfile too
+    monkeypatch.setattr(uploads, 'tempfile', types.SimpleNamespace(TemporaryFile=temporary_file))
+    monkeypatch.setattr(app_module, 'process_patient',
+                        lambda patient, send_api, **kwargs: {'patient': patient.to_dict()})
+    from settings import reset_settings
+    reset_settings()
+
+    response = app_module.app.test_client().post('/process', data={'csv_file': (io.BytesIO(body), 'big.csv')})
+    result = response.get_json()
+    assert result['count'] == 20000
+    assert len(result['data']) == 10 and result['truncated']
+    assert copies == []
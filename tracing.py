@@ -0,0 +1,179 @@
+"""
+Per-row tracing of the upstream calls, exported offline as OTLP/JSON.
+
+With XPC_TRACE_FILE set, every CSV row becomes a trace: a `csv_row` root
+span with a child span per pipeline step (parse_date_time, create_patient0,
+search_patient_by_name, search_practitioner_by_name, create_appointment),
+and under those a client span per HTTP request carrying its status code and
+payload sizes. Spans are appended to the file as JSON lines, each line an
+OTLP ExportTraceServiceRequest, so the file can be replayed into any OTLP
+collector or read directly. With the variable unset, span() hands back a
+shared no-op object.
+"""
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from settings import get_settings
+
+SERVICE_NAME = 'xpc-importer'
+
+# OTLP enum values
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Spans buffered before a write when no root span has finished
+FLUSH_SPANS = 512
+
+_current: ContextVar[Optional['Span']] = ContextVar('xpc_current_span', default=None)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        # int64 values are strings in OTLP/JSON
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Span:
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]], kind: int, exporter: 'JsonFileExporter'):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.kind = kind
+        self.exporter = exporter
+        self.trace_id = ''
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = None
+        self.start = 0
+        self.end = 0
+        self.error = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is not None:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+        else:
+            self.trace_id = os.urandom(16).hex()
+        self._token = _current.set(self)
+        self.start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.time_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+        self.exporter.export(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error else {'code': STATUS_OK}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class JsonFileExporter:
+    """
+    Appends finished spans to a file, one OTLP/JSON export request per line.
+
+    Spans are written when a root span (a whole row) finishes, or once
+    FLUSH_SPANS have piled up.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._pending: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._pending.append(span)
+            if span.parent_id is None or len(self._pending) >= FLUSH_SPANS:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        spans, self._pending = self._pending, []
+        request = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+            'scopeSpans': [{'scope': {'name': 'xpc.tracing'}, 'spans': [span.to_otlp() for span in spans]}]
+        }]}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(request, separators=(',', ':')) + '\n')
+
+
+@lru_cache(maxsize=None)
+def get_exporter() -> Optional[JsonFileExporter]:
+    path = get_settings().trace_file
+    return JsonFileExporter(path) if path else None
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = SPAN_KIND_INTERNAL):
+    """
+    Context manager for a child of the current span, or a new trace's root.
+    """
+    exporter = get_exporter()
+    if exporter is None:
+        return _NOOP_SPAN
+    return Span(name, attributes, kind, exporter)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def row_span(index: Optional[int] = None, source: Optional[str] = None):
+    """
+    Root span of one CSV row's trace.
+    """
+    attributes = {'row.index': index}
+    if source:
+        attributes['row.source'] = source
+    return span('csv_row', attributes)
@@ -0,0 +1,250 @@
+"""
+Bounded-memory handling of uploaded CSV files.
+
+Uploads are spooled: small files stay in memory, anything above the spool
+threshold is copied to a temporary file and memory-mapped. An upload the
+web server already wrote to a temporary file is mapped in place instead of
+being copied again. The text is then decoded incrementally with a sniffed
+charset, so a 1 GB export is read a block at a time instead of as one
+bytes object plus one str.
+"""
+import codecs
+import io
+import mmap
+import os
+import tempfile
+import zipfile
+from typing import Optional
+
+# How much of the file is inspected when guessing the charset
+SNIFF_BYTES = 1024 * 1024
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# Checked longest first, since the UTF-32 LE BOM starts with the UTF-16 LE one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def sniff_encoding(sample: bytes, complete: bool = False) -> str:
+    """
+    Guess the charset of a CSV export from its first bytes.
+
+    A BOM wins; otherwise UTF-8 is used when the sample decodes cleanly,
+    then Windows-1252 (what Excel writes for "CSV") and finally Latin-1,
+    which accepts any byte sequence. `complete` says the sample is the
+    whole file rather than a prefix of it.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    try:
+        # A prefix may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=complete)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        sample.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+class _MappedReader(io.RawIOBase):
+    """
+    Read-only raw stream over an mmap, so it can be wrapped in a TextIOWrapper.
+    """
+
+    def __init__(self, mapped: mmap.mmap):
+        self._mapped = mapped
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._mapped)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer):
+        data = self._mapped[self._pos:self._pos + len(buffer)]
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+class SpooledUpload:
+    """
+    An uploaded file held in memory, or in a file on disk: a temporary file
+    once it outgrew the spool threshold, or the caller's own file, which is
+    left open (`owns_file=False`).
+    """
+
+    def __init__(self, buffer: Optional[io.BytesIO], file, size: int, owns_file: bool = True):
+        self._buffer = buffer
+        self._file = file
+        self._owns_file = owns_file
+        self.size = size
+        self._mapped = None
+
+    @property
+    def on_disk(self) -> bool:
+        return self._file is not None
+
+    def view(self):
+        """
+        Return the raw bytes: an mmap for spooled files, a bytes object otherwise.
+        """
+        if not self.on_disk:
+            return self._buffer.getvalue()
+        if self._mapped is None:
+            if self.size == 0:
+                return b''
+            self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mapped
+
+    def sample(self, size: int = SNIFF_BYTES) -> bytes:
+        return bytes(self.view()[:size])
+
+    def open_binary(self):
+        view = self.view()
+        if isinstance(view, mmap.mmap):
+            return io.BufferedReader(_MappedReader(view))
+        return io.BytesIO(view)
+
+    def open_text(self, encoding: Optional[str] = None):
+        """
+        Open the upload as a text stream, decoded incrementally with a sniffed charset.
+
+        Bytes that are invalid in the detected charset are replaced rather
+        than aborting the whole upload.
+        """
+        if encoding is None:
+            encoding = sniff_encoding(self.sample(), complete=self.size <= SNIFF_BYTES)
+        return io.TextIOWrapper(self.open_binary(), encoding=encoding, errors='replace', newline='')
+
+    def close(self):
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+        if self._file is not None and self._owns_file:
+            self._file.close()
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _file_size(stream) -> Optional[int]:
+    """
+    Size of a stream backed by a file on disk and positioned at its start; None for anything else.
+    """
+    if not getattr(stream, '_rolled', True):
+        # A SpooledTemporaryFile still in memory; fileno() would write it to disk
+        return None
+    try:
+        fileno = stream.fileno()
+        if stream.tell() != 0:
+            return None
+        return os.fstat(fileno).st_size
+    except (AttributeError, OSError, ValueError):
+        # No file descriptor, e.g. io.BytesIO (io.UnsupportedOperation)
+        return None
+
+
+def spool_upload(stream, spool_threshold: int, max_bytes: Optional[int] = None) -> SpooledUpload:
+    """
+    Turn a binary stream into a SpooledUpload, enforcing `max_bytes`.
+
+    A stream that already is a file (Werkzeug keeps large uploads in a
+    temporary file) is used as it is; other streams are copied.
+    """
+    size = _file_size(stream)
+    if size is not None:
+        if max_bytes is not None and size > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+        return SpooledUpload(None, stream, size, owns_file=False)
+
+    buffer = io.BytesIO()
+    file = None
+    size = 0
+    try:
+        while True:
+            chunk = stream.read(COPY_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+            if file is None and size > spool_threshold:
+                # Outgrew memory: move what we have so far to disk
+                file = tempfile.TemporaryFile()
+                file.write(buffer.getvalue())
+                buffer = None
+            (file or buffer).write(chunk)
+        if file is not None:
+            file.flush()
+    except BaseException:
+        if file is not None:
+            file.close()
+        raise
+    return SpooledUpload(buffer, file, size)
+
+
+def open_zip_member_text(archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """
+    Open a ZIP member as a text stream without extracting it to disk.
+    """
+    with archive.open(info) as member:
+        sample = member.read(SNIFF_BYTES)
+    encoding = sniff_encoding(sample, complete=info.file_size <= SNIFF_BYTES)
+    return io.TextIOWrapper(archive.open(info), encoding=encoding, errors='replace', newline='')
+
+
+def iter_csv_members(archive: zipfile.ZipFile, max_member_bytes: Optional[int] = None):
+    """
+    Yield the CSV members of an archive, skipping directories and macOS metadata.
+    """
+    for info in archive.infolist():
+        name = info.filename
+        if info.is_dir() or name.startswith('__MACOSX/') or not name.lower().endswith('.csv'):
+            continue
+        if max_member_bytes is not None and info.file_size > max_member_bytes:
+            raise UploadTooLarge(f"{name} expands to more than the {max_member_bytes} byte limit")
+        yield info
+
+
+def open_csv_path(path: str):
+    """
+    Open a CSV file on disk as a text stream with a sniffed charset.
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(SNIFF_BYTES)
+        complete = not f.read(1)
+    encoding = sniff_encoding(sample, complete=complete)
+    return open(path, encoding=encoding, errors='replace', newline='')
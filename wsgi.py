@@ -0,0 +1,10 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Vercel's Python runtime also picks up `app` from this module.
+"""
+from app import app
+
+__all__ = ['app']